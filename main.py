@@ -24,24 +24,62 @@ API usage:
 
 import argparse
 import asyncio
+import contextlib
+import functools
 import hashlib
+import heapq
+import importlib.util
+import itertools
 import json
+import operator
 import os
+import re
+import statistics
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 from datetime import datetime
-from openai import OpenAI, AsyncOpenAI
 
-# Optional dependencies for deduplication
+# Optional dependencies for deduplication (imported where used to keep startup fast)
+HAS_FAISS = (importlib.util.find_spec("numpy") is not None and
+             importlib.util.find_spec("faiss") is not None)
+
+# Optional dependency for HTTP/2 multiplexing of OpenRouter requests (httpx imports it itself)
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
+# Optional dependency (ratelimit extra) for client-side rate limiting of OpenRouter requests
+try:
+    from aiolimiter import AsyncLimiter
+    HAS_AIOLIMITER = True
+except ImportError:
+    HAS_AIOLIMITER = False
+
+# Optional dependency (fastjson extra) for fast JSON encoding and decoding (API bodies, caches)
 try:
-    import numpy as np
-    import faiss
-    HAS_FAISS = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_FAISS = False
+    HAS_ORJSON = False
+
+# itertools.batched is Python 3.12+; same chunking for older interpreters
+try:
+    from itertools import batched
+except ImportError:
+    def batched(iterable, n):
+        """Yield successive chunks of up to n items from iterable."""
+        iterator = iter(iterable)
+        while chunk := tuple(itertools.islice(iterator, n)):
+            yield chunk
 
 BASE_URL = "https://app.mochi.cards/api"
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Headers for pre-serialized JSON request bodies
+JSON_HEADERS = {"Content-Type": "application/json"}
 
 # Config file location
 CONFIG_PATH = Path.home() / ".mochimochi" / "config"
@@ -51,6 +89,7 @@ CACHE_DIR = Path.home() / ".mochimochi" / "cache"
 EMBEDDING_CACHE_FILE = CACHE_DIR / "embeddings.json"
 CLASSIFICATION_CACHE_FILE = CACHE_DIR / "classifications.json"
 GRADING_CACHE_FILE = CACHE_DIR / "gradings.json"
+LLM_STATS_FILE = CACHE_DIR / "llm_stats.json"
 
 # Models for deduplication and curation
 EMBEDDING_MODEL = "openai/text-embedding-3-small"
@@ -60,6 +99,25 @@ CURATION_MODEL = "google/gemini-2.5-flash"
 # Parallel LLM call limit
 PARALLEL_LLM_CALLS = 10
 
+# Auto-tuning bounds for parallel LLM calls and size of the latency ring buffer
+MAX_PARALLEL_LLM_CALLS = 64
+LLM_STATS_WINDOW = 200
+
+# Retries for transient API failures (rate limits, server errors)
+API_MAX_RETRIES = 5
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# OpenRouter connection pool (requests are multiplexed over HTTP/2 when h2 is installed)
+LLM_MAX_CONNECTIONS = 50
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+LLM_TIMEOUT = 60
+
+# OpenRouter request budget enforced client-side when aiolimiter is installed
+LLM_REQUESTS_PER_MINUTE = 500
+
+# Parallel Mochi API call limit (for bulk card creates, updates and deletes)
+PARALLEL_API_CALLS = 8
+
 # Classification prompt template
 CLASSIFICATION_PROMPT_TEMPLATE = """Compare these two flashcards and classify their relationship:
 
@@ -83,14 +141,8 @@ classification | reasoning (one line explanation)
 
 Example: complementary | Card 1 asks about increasing X, Card 2 about decreasing X - opposite scenarios of same concept"""
 
-# Quality grading prompt template
-QUALITY_GRADING_PROMPT_TEMPLATE = """Evaluate this flashcard against quality standards and assign a quality score from 0 to 10.
-
-Card:
-Q: {question}
-A: {answer}
-
-Quality Standards (CRITICAL - these are non-negotiable):
+# Quality standards shared by the grading and improvement prompts
+QUALITY_STANDARDS = """Quality Standards (CRITICAL - these are non-negotiable):
 1. **Succinct Question**: Question must be concise with zero bloat. Every word must be necessary.
 2. **Succinct Answer**: Answer must be brief and direct. No bloat, no fluff, no elaboration beyond what was asked.
 3. **Self-Contained Question**: Question MUST include ALL context needed to answer it. Reader should not need ANY external information.
@@ -100,7 +152,16 @@ Quality Standards (CRITICAL - these are non-negotiable):
 7. **Atomic**: Each card should test ONE concept (no compound questions)
 8. **Active Recall**: Question should trigger active retrieval, not passive recognition
 9. **No Hints**: Question should not contain hints about the answer
-10. **No Redundancy**: Avoid repeating information between question and answer
+10. **No Redundancy**: Avoid repeating information between question and answer"""
+
+# Quality grading prompt template
+QUALITY_GRADING_PROMPT_TEMPLATE = """Evaluate this flashcard against quality standards and assign a quality score from 0 to 10.
+
+Card:
+Q: {question}
+A: {answer}
+
+""" + QUALITY_STANDARDS + """
 
 Respond with EXACTLY this format:
 score | reasoning
@@ -116,17 +177,7 @@ A: {answer}
 
 Issues identified: {reasoning}
 
-Quality Standards (CRITICAL - these are non-negotiable):
-1. **Succinct Question**: Question must be concise with zero bloat. Every word must be necessary.
-2. **Succinct Answer**: Answer must be brief and direct. No bloat, no fluff, no elaboration beyond what was asked.
-3. **Self-Contained Question**: Question MUST include ALL context needed to answer it. Reader should not need ANY external information.
-4. **Answer Scope**: Answer ONLY what was asked. Do NOT add related context, background, or extra information.
-5. **Clarity**: Question and answer should be clear, unambiguous, and easy to understand
-6. **Accuracy**: Information must be factually correct
-7. **Atomic**: Each card should test ONE concept (no compound questions)
-8. **Active Recall**: Question should trigger active retrieval, not passive recognition
-9. **No Hints**: Question should not contain hints about the answer
-10. **No Redundancy**: Avoid repeating information between question and answer
+""" + QUALITY_STANDARDS + """
 
 IMPORTANT REMINDERS:
 - Question: Add ALL necessary context so it's self-contained, but keep it succinct
@@ -138,6 +189,55 @@ QUESTION: <improved question>
 ---
 ANSWER: <improved answer>"""
 
+class MochiRetry(Retry):
+    """Retry policy that only replays a POST when it was rate limited.
+
+    POST creates cards and decks, so it is not idempotent: if the server
+    applied it and then timed out or answered 5xx, a retry would create a
+    duplicate. A 429 means the request was rejected, so resending is safe.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST":
+            return status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if error is not None and method and method.upper() == "POST":
+            # Give up on the first connection/read error instead of resending
+            no_retries = self.new(connect=0, read=0, other=0)
+            return super(MochiRetry, no_retries).increment(method, url, response, error, _pool, _stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def create_session():
+    """Create a requests session that retries transient Mochi API failures.
+
+    Rate limits and server errors are retried with exponential backoff
+    (honoring Retry-After) instead of aborting the whole run. POST requests
+    are only retried on 429 (see MochiRetry).
+    """
+    retry = MochiRetry(
+        total=API_MAX_RETRIES,
+        backoff_factor=1.0,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        allowed_methods=frozenset(["GET", "DELETE"]),
+        raise_on_status=False  # Let raise_for_status() report the final response
+    )
+    # Keep-alive pool sized well above PARALLEL_API_CALLS so concurrent calls reuse connections
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=20, pool_maxsize=50)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    # requests already advertises gzip/deflate (and br when brotli is installed)
+    session.headers["Accept"] = "application/json"
+    return session
+
+
+# Shared HTTP session for Mochi API calls
+SESSION = create_session()
+
 # Global API key (set in main())
 API_KEY = None
 OPENAI_API_KEY = None
@@ -299,14 +399,14 @@ def load_embedding_cache():
     """Load embedding cache from disk.
 
     Returns:
-        dict: Cache mapping content_hash -> embedding vector (list of floats)
+        dict: Cache mapping embedding_cache_key -> embedding vector (list of floats)
     """
     if not EMBEDDING_CACHE_FILE.exists():
         return {}
 
     try:
-        with open(EMBEDDING_CACHE_FILE, 'r') as f:
-            return json.load(f)
+        with open(EMBEDDING_CACHE_FILE, 'rb') as f:
+            return decode_json(f.read())
     except Exception as e:
         print(f"Warning: Failed to load embedding cache: {e}")
         return {}
@@ -316,14 +416,14 @@ def save_embedding_cache(cache):
     """Save embedding cache to disk.
 
     Args:
-        cache: Dict mapping content_hash -> embedding vector
+        cache: Dict mapping embedding_cache_key -> embedding vector
     """
     try:
         # Create cache directory if it doesn't exist
         CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-        with open(EMBEDDING_CACHE_FILE, 'w') as f:
-            json.dump(cache, f)
+        with open(EMBEDDING_CACHE_FILE, 'wb') as f:
+            f.write(encode_json(cache))
     except Exception as e:
         print(f"Warning: Failed to save embedding cache: {e}")
 
@@ -338,8 +438,8 @@ def load_classification_cache():
         return {}
 
     try:
-        with open(CLASSIFICATION_CACHE_FILE, 'r') as f:
-            return json.load(f)
+        with open(CLASSIFICATION_CACHE_FILE, 'rb') as f:
+            return decode_json(f.read())
     except Exception as e:
         print(f"Warning: Failed to load classification cache: {e}")
         return {}
@@ -355,8 +455,8 @@ def save_classification_cache(cache):
         # Create cache directory if it doesn't exist
         CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-        with open(CLASSIFICATION_CACHE_FILE, 'w') as f:
-            json.dump(cache, f)
+        with open(CLASSIFICATION_CACHE_FILE, 'wb') as f:
+            f.write(encode_json(cache))
     except Exception as e:
         print(f"Warning: Failed to save classification cache: {e}")
 
@@ -371,8 +471,8 @@ def load_grading_cache():
         return {}
 
     try:
-        with open(GRADING_CACHE_FILE, 'r') as f:
-            return json.load(f)
+        with open(GRADING_CACHE_FILE, 'rb') as f:
+            return decode_json(f.read())
     except Exception as e:
         print(f"Warning: Failed to load grading cache: {e}")
         return {}
@@ -388,39 +488,126 @@ def save_grading_cache(cache):
         # Create cache directory if it doesn't exist
         CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-        with open(GRADING_CACHE_FILE, 'w') as f:
-            json.dump(cache, f)
+        with open(GRADING_CACHE_FILE, 'wb') as f:
+            f.write(encode_json(cache))
     except Exception as e:
         print(f"Warning: Failed to save grading cache: {e}")
 
 
+def load_llm_stats():
+    """Load LLM latency stats from disk.
+
+    Returns:
+        dict: Stats with keys 'parallel' (tuned concurrency) and 'latencies' (recent seconds per call)
+    """
+    if not LLM_STATS_FILE.exists():
+        return {}
+
+    try:
+        with open(LLM_STATS_FILE, 'rb') as f:
+            return decode_json(f.read())
+    except Exception as e:
+        print(f"Warning: Failed to load LLM stats: {e}")
+        return {}
+
+
+def save_llm_stats(stats):
+    """Save LLM latency stats to disk.
+
+    Args:
+        stats: Dict with keys 'parallel' and 'latencies'
+    """
+    try:
+        # Create cache directory if it doesn't exist
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+        with open(LLM_STATS_FILE, 'wb') as f:
+            f.write(encode_json(stats))
+    except Exception as e:
+        print(f"Warning: Failed to save LLM stats: {e}")
+
+
+def tuned_parallelism(llm_stats, max_concurrency):
+    """Pick this run's LLM concurrency from stats saved by previous runs.
+
+    Args:
+        llm_stats: Stats loaded by load_llm_stats()
+        max_concurrency: User-requested concurrency, which the tuned value never exceeds
+
+    Returns:
+        int: Stored concurrency clamped to max_concurrency, or max_concurrency if
+        nothing valid was stored
+    """
+    parallel = llm_stats.get('parallel')
+    if isinstance(parallel, int) and not isinstance(parallel, bool) and parallel > 0:
+        return min(parallel, max_concurrency)
+    return max_concurrency
+
+
+def tune_parallelism(parallel, run_latencies, error_count, history):
+    """Pick the next run's LLM concurrency with additive-increase/multiplicative-decrease.
+
+    Args:
+        parallel: Concurrency used for this run
+        run_latencies: Seconds per LLM call observed in this run
+        error_count: Number of rate-limited (429) LLM calls in this run
+        history: Per-call latencies from previous runs
+
+    Returns:
+        int: Concurrency to use for the next run
+    """
+    # The provider is throttling us: back off hard
+    if error_count:
+        return max(1, parallel // 2)
+
+    # Latency degraded noticeably at this concurrency: hold steady
+    if run_latencies and history:
+        if statistics.median(run_latencies) > 1.5 * statistics.median(history):
+            return parallel
+
+    return min(MAX_PARALLEL_LLM_CALLS, parallel + 1)
+
+
 def parse_card(content):
     """Parse card content into question and answer."""
     q, _, a = content.partition('---')
     return q.strip(), a.strip()
 
 
+@functools.lru_cache(maxsize=8192)
 def content_hash(question, answer):
-    """Generate hash of card content for duplicate detection."""
-    content = f"{question.strip()}\n---\n{answer.strip()}"
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+    """Generate hash of card content for duplicate detection.
+
+    Uses 64-bit BLAKE2b (16 hex chars), which is faster than SHA-256 on short
+    inputs. The NUL separator keeps ("ab", "c") and ("a", "bc") distinct.
+    Memoized because sync/push hash the same local and remote cards repeatedly.
+    """
+    content = f"{question.strip()}\x00{answer.strip()}"
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
 
 
-def embedding_cache_key(content_hash, model=None):
+def embedding_cache_key(question, answer, model=None):
     """Generate cache key for embedding that includes model ID.
 
+    Keyed on the card text rather than content_hash, so changing the
+    duplicate-detection hash never orphans cached embeddings.
+
     Args:
-        content_hash: Hash of card content
+        question: Card question
+        answer: Card answer
         model: Embedding model name (defaults to EMBEDDING_MODEL)
 
     Returns:
-        Cache key string: hash of (model + content_hash)
+        Cache key string: hash of (model + card content)
     """
     if model is None:
         model = EMBEDDING_MODEL
 
+    content = f"{question.strip()}\n---\n{answer.strip()}"
+    text_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
     # Hash the combination of model and content
-    key_input = f"{model}:{content_hash}"
+    key_input = f"{model}:{text_hash}"
     return hashlib.sha256(key_input.encode('utf-8')).hexdigest()[:16]
 
 
@@ -467,10 +654,47 @@ def grading_cache_key(question, answer, prompt, model=None):
     return hashlib.sha256(key_input.encode('utf-8')).hexdigest()[:16]
 
 
+def grading_prompt(card):
+    """Build the quality-grading prompt for a card."""
+    return QUALITY_GRADING_PROMPT_TEMPLATE.format(question=card['question'], answer=card['answer'])
+
+
+def card_grading_cache_key(card):
+    """Grading cache key for a card under the current model and grading prompt."""
+    return grading_cache_key(card['question'], card['answer'], grading_prompt(card))
+
+
+def lookup_cached_grade(card, grading_cache):
+    """Look up a card's quality grade in the grading cache without calling the LLM.
+
+    Args:
+        card: Card dict with question and answer
+        grading_cache: Cache dict as returned by load_grading_cache
+
+    Returns:
+        tuple: (score, reasoning), or None if the card has not been graded with the current model and prompt
+    """
+    cached = grading_cache.get(card_grading_cache_key(card))
+    if cached is None:
+        return None
+    return cached[0], cached[1]
+
+
+def store_cached_grade(card, grading_cache, score, reasoning):
+    """Record a card's quality grade in the grading cache.
+
+    Args:
+        card: Card dict with question and answer
+        grading_cache: Cache dict as returned by load_grading_cache
+        score: Quality score from 0-10
+        reasoning: Explanation from LLM
+    """
+    grading_cache[card_grading_cache_key(card)] = [score, reasoning]
+
+
 def sanitize_filename(name):
     """Sanitize deck name for use in filename."""
     # Replace spaces and special chars with hyphens
-    import re
     name = re.sub(r'[^\w\s-]', '', name)
     name = re.sub(r'[-\s]+', '-', name)
     return name.strip('-').lower()
@@ -551,7 +775,7 @@ def parse_markdown_cards(markdown_text):
 
             tags_value = frontmatter.get('tags', '[]')
             try:
-                tags = json.loads(tags_value) if tags_value else []
+                tags = decode_json(tags_value) if tags_value else []
             except json.JSONDecodeError:
                 tags = []
 
@@ -586,6 +810,15 @@ def parse_markdown_cards(markdown_text):
     return cards
 
 
+def load_deck_cards(file_path):
+    """Read a deck file and parse it into card dictionaries.
+
+    Returns:
+        List of dicts with keys: card_id, question, answer, tags, archived, content_hash
+    """
+    return parse_markdown_cards(Path(file_path).read_text(encoding='utf-8'))
+
+
 def format_card_to_markdown(card):
     """Format a card dict to markdown with frontmatter.
 
@@ -614,27 +847,53 @@ def format_card_to_markdown(card):
     return '\n'.join(lines)
 
 
+def write_deck_file(file_path, cards):
+    """Write cards to a deck file in a single write.
+
+    Args:
+        file_path: Path of the deck file to (over)write
+        cards: List of card dicts to format with format_card_to_markdown
+    """
+    content = ''.join(format_card_to_markdown(card) + '\n' for card in cards)
+    with Path(file_path).open('w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(content)
+
+
+def encode_json(data):
+    """Serialize data to JSON bytes (uses orjson when available)."""
+    if HAS_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+
+def decode_json(data):
+    """Parse JSON from bytes or str (uses orjson when available)."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def get_decks():
     """Fetch all decks."""
-    response = requests.get(
+    response = SESSION.get(
         f"{BASE_URL}/decks/",
         auth=(API_KEY, ""),
         timeout=30
     )
     response.raise_for_status()
-    data = response.json()
+    data = decode_json(response.content)
     return data["docs"]
 
 
 def get_deck(deck_id):
     """Fetch a specific deck by ID."""
-    response = requests.get(
+    response = SESSION.get(
         f"{BASE_URL}/decks/{deck_id}",
         auth=(API_KEY, ""),
         timeout=30
     )
     response.raise_for_status()
-    return response.json()
+    return decode_json(response.content)
 
 
 def create_deck(name, **kwargs):
@@ -652,14 +911,15 @@ def create_deck(name, **kwargs):
         **kwargs
     }
 
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/decks/",
         auth=(API_KEY, ""),
-        json=data,
+        headers=JSON_HEADERS,
+        data=encode_json(data),
         timeout=30
     )
     response.raise_for_status()
-    return response.json()
+    return decode_json(response.content)
 
 
 def create_card(deck_id, content, **kwargs):
@@ -679,14 +939,15 @@ def create_card(deck_id, content, **kwargs):
         **kwargs
     }
 
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/cards/",
         auth=(API_KEY, ""),
-        json=data,
+        headers=JSON_HEADERS,
+        data=encode_json(data),
         timeout=30
     )
     response.raise_for_status()
-    return response.json()
+    return decode_json(response.content)
 
 
 def update_card(card_id, **kwargs):
@@ -699,14 +960,15 @@ def update_card(card_id, **kwargs):
     Returns:
         Updated card data
     """
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/cards/{card_id}",
         auth=(API_KEY, ""),
-        json=kwargs,
+        headers=JSON_HEADERS,
+        data=encode_json(kwargs),
         timeout=30
     )
     response.raise_for_status()
-    return response.json()
+    return decode_json(response.content)
 
 
 def delete_card(card_id):
@@ -718,7 +980,7 @@ def delete_card(card_id):
     Returns:
         True if successful
     """
-    response = requests.delete(
+    response = SESSION.delete(
         f"{BASE_URL}/cards/{card_id}",
         auth=(API_KEY, ""),
         timeout=30
@@ -732,19 +994,21 @@ def get_cards(deck_id, limit=100):
     cards = []
     bookmark = None
 
+    # Pages are fetched strictly in sequence: the bookmark for page N+1 only
+    # exists in the body of page N, so there is nothing to prefetch.
     while True:
         params = {"deck-id": deck_id, "limit": limit}
         if bookmark:
             params["bookmark"] = bookmark
 
-        response = requests.get(
+        response = SESSION.get(
             f"{BASE_URL}/cards/",
             auth=(API_KEY, ""),
             params=params,
             timeout=30
         )
         response.raise_for_status()
-        data = response.json()
+        data = decode_json(response.content)
 
         batch_size = len(data["docs"])
         if batch_size == 0:
@@ -759,6 +1023,173 @@ def get_cards(deck_id, limit=100):
     return cards
 
 
+def run_card_calls(func, calls):
+    """Run Mochi card API calls concurrently over the shared SESSION.
+
+    Failed requests are collected rather than raised so the calls that did
+    succeed are not lost; any other exception propagates.
+
+    Args:
+        func: Single-card API function (create_card, update_card, delete_card)
+        calls: List of (args, kwargs) tuples to pass to func
+
+    Returns:
+        Tuple of (successes, failures): successes is a list of (index, result),
+        failures a list of (index, exception), both in the same order as calls
+    """
+    if not calls:
+        return [], []
+
+    successes = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=min(PARALLEL_API_CALLS, len(calls))) as executor:
+        futures = [executor.submit(func, *args, **kwargs) for args, kwargs in calls]
+        for index, future in enumerate(futures):
+            try:
+                successes.append((index, future.result()))
+            except requests.RequestException as e:
+                failures.append((index, e))
+
+    return successes, failures
+
+
+def create_cards_bulk(deck_id, items):
+    """Create several cards in a deck concurrently.
+
+    Args:
+        deck_id: ID of the deck to add the cards to
+        items: List of dicts with 'content' and optional 'kwargs' for create_card
+
+    Returns:
+        Tuple of (successes, failures) as returned by run_card_calls
+    """
+    return run_card_calls(
+        create_card,
+        [((deck_id, item['content']), item.get('kwargs', {})) for item in items]
+    )
+
+
+def update_cards_bulk(updates):
+    """Update several cards concurrently.
+
+    Args:
+        updates: List of (card_id, kwargs) tuples to pass to update_card
+
+    Returns:
+        Tuple of (successes, failures) as returned by run_card_calls
+    """
+    return run_card_calls(update_card, [((card_id,), kwargs) for card_id, kwargs in updates])
+
+
+def delete_cards_bulk(card_ids):
+    """Delete several cards concurrently.
+
+    Args:
+        card_ids: List of card IDs to delete
+
+    Returns:
+        Tuple of (successes, failures) as returned by run_card_calls
+    """
+    return run_card_calls(delete_card, [((card_id,), {}) for card_id in card_ids])
+
+
+def card_payload(card, include_content=False):
+    """Build create_card/update_card keyword arguments for a local card.
+
+    Args:
+        card: Parsed local card dict
+        include_content: If True, include the card content in the kwargs (for updates)
+
+    Returns:
+        Tuple of (content, kwargs)
+    """
+    content = f"{card['question']}\n---\n{card['answer']}"
+    kwargs = {'content': content} if include_content else {}
+    if card['tags']:
+        kwargs['tags'] = card['tags']
+    if card.get('archived'):
+        kwargs['archived?'] = True
+    return content, kwargs
+
+
+def apply_remote_changes(deck_id, to_create, to_update, to_delete, delete_label="Deleted"):
+    """Create, update and delete cards remotely, fanning each group out concurrently.
+
+    Cards in to_create get their new card_id assigned on success.
+
+    Args:
+        deck_id: ID of the deck being pushed
+        to_create: Local cards to create remotely
+        to_update: Local cards whose remote content should be replaced
+        to_delete: Iterable of remote card IDs to delete
+        delete_label: Verb printed for each deleted card
+
+    Returns:
+        Tuple of (created_count, updated_count, deleted_count, failures) where
+        failures is a list of (description, exception) for the requests that failed
+    """
+    failures = []
+
+    create_items = []
+    for card in to_create:
+        content, kwargs = card_payload(card)
+        create_items.append({'content': content, 'kwargs': kwargs})
+    created, failed = create_cards_bulk(deck_id, create_items)
+    for index, card_data in created:
+        card = to_create[index]
+        card['card_id'] = card_data['id']
+        print(f"  ✓ Created {card_data['id']}: {card['question'][:50]}...")
+    failures.extend((f"create '{to_create[index]['question'][:50]}'", e) for index, e in failed)
+
+    updates = [(card['card_id'], card_payload(card, include_content=True)[1]) for card in to_update]
+    updated, failed = update_cards_bulk(updates)
+    for index, _ in updated:
+        card = to_update[index]
+        print(f"  ✓ Updated {card['card_id']}: {card['question'][:50]}...")
+    failures.extend((f"update {to_update[index]['card_id']}", e) for index, e in failed)
+
+    to_delete = list(to_delete)
+    deleted, failed = delete_cards_bulk(to_delete)
+    for index, _ in deleted:
+        print(f"  ✓ {delete_label} {to_delete[index]}")
+    failures.extend((f"delete {to_delete[index]}", e) for index, e in failed)
+
+    return len(created), len(updated), len(deleted), failures
+
+
+def report_failures(failures):
+    """Print failed remote operations and re-raise the first error.
+
+    Args:
+        failures: List of (description, exception) tuples from apply_remote_changes
+    """
+    if not failures:
+        return
+    print(f"\n❌ {len(failures)} remote operation(s) failed:")
+    for description, error in failures:
+        print(f"  ✗ {description}: {error}")
+    raise failures[0][1]
+
+
+def index_remote_cards(remote_cards):
+    """Index remote cards by content hash, parsing each card's content only once.
+
+    Args:
+        remote_cards: Card data as returned by get_cards
+
+    Returns:
+        tuple: (hash_by_id, id_by_hash) where hash_by_id maps card ID -> content hash
+        and id_by_hash maps content hash -> card ID (for duplicate detection)
+    """
+    hash_by_id = {}
+    id_by_hash = {}
+    for card in remote_cards:
+        h = content_hash(*parse_card(card['content']))
+        hash_by_id[card['id']] = h
+        id_by_hash[h] = card['id']
+    return hash_by_id, id_by_hash
+
+
 def find_deck_files(directory='.'):
     """Find all deck files in the specified directory.
 
@@ -894,9 +1325,7 @@ def pull(deck_id):
         })
 
     # Write to local file
-    with local_file.open('w', encoding='utf-8') as f:
-        for card in remote_dict_cards:
-            f.write(format_card_to_markdown(card) + '\n')
+    write_deck_file(local_file, remote_dict_cards)
 
     print(f"✓ Downloaded {len(remote_dict_cards)} cards to {local_file}")
 
@@ -960,14 +1389,7 @@ def push(file_path, force=False):
 
     print("Fetching remote cards...")
     remote_cards = get_cards(deck_id)
-    remote_by_id = {c['id']: c for c in remote_cards}
-
-    # Build content hash index for duplicate detection
-    remote_hashes = {}
-    for card in remote_cards:
-        q, a = parse_card(card['content'])
-        h = content_hash(q, a)
-        remote_hashes[h] = card['id']
+    remote_hash_by_id, remote_hashes = index_remote_cards(remote_cards)
 
     # Determine operations needed
     to_create = []
@@ -980,12 +1402,8 @@ def push(file_path, force=False):
 
         if card_id:
             # Card has ID - check if update needed
-            if card_id in remote_by_id:
-                remote_card = remote_by_id[card_id]
-                remote_q, remote_a = parse_card(remote_card['content'])
-                remote_hash = content_hash(remote_q, remote_a)
-
-                if local_card['content_hash'] != remote_hash:
+            if card_id in remote_hash_by_id:
+                if local_card['content_hash'] != remote_hash_by_id[card_id]:
                     to_update.append(local_card)
             else:
                 # Card has ID but doesn't exist remotely - data inconsistency!
@@ -1012,7 +1430,7 @@ def push(file_path, force=False):
 
     # Find deletions: remote cards not in local
     local_ids = {c['card_id'] for c in local_cards if c['card_id']}
-    remote_ids = set(remote_by_id.keys())
+    remote_ids = set(remote_hash_by_id.keys())
     to_delete = remote_ids - local_ids
 
     # Handle duplicates
@@ -1040,51 +1458,18 @@ def push(file_path, force=False):
         return
 
     # Apply changes
-    created_count = 0
-    updated_count = 0
-    deleted_count = 0
-
-    for card in to_create:
-        content = f"{card['question']}\n---\n{card['answer']}"
-        kwargs = {}
-        if card['tags']:
-            kwargs['tags'] = card['tags']
-        if card['archived']:
-            kwargs['archived?'] = True
-
-        created = create_card(deck_id, content, **kwargs)
-        print(f"  ✓ Created {created['id']}: {card['question'][:50]}...")
-        created_count += 1
-
-        # Update card with new ID
-        card['card_id'] = created['id']
-
-    for card in to_update:
-        content = f"{card['question']}\n---\n{card['answer']}"
-        kwargs = {'content': content}
-        if card['tags']:
-            kwargs['tags'] = card['tags']
-        if card.get('archived'):
-            kwargs['archived?'] = True
-
-        update_card(card['card_id'], **kwargs)
-        print(f"  ✓ Updated {card['card_id']}: {card['question'][:50]}...")
-        updated_count += 1
-
-    for card_id in to_delete:
-        delete_card(card_id)
-        print(f"  ✓ Deleted {card_id}")
-        deleted_count += 1
+    created_count, updated_count, deleted_count, failures = apply_remote_changes(
+        deck_id, to_create, to_update, to_delete
+    )
 
     # Write back local file with new IDs from created cards
     if created_count > 0:
-        with local_file.open('w', encoding='utf-8') as f:
-            for card in local_cards:
-                f.write(format_card_to_markdown(card) + '\n')
+        write_deck_file(local_file, local_cards)
         print(f"\nℹ Updated {local_file} with new card IDs")
         print(f"Tip: Commit these changes: git add {local_file.name} && git commit -m 'Add card IDs'")
 
     print(f"\n✓ Pushed changes: {created_count} created, {updated_count} updated, {deleted_count} deleted")
+    report_failures(failures)
 
 
 def sync(file_path, force=False):
@@ -1119,14 +1504,7 @@ def sync(file_path, force=False):
 
     print("Fetching remote cards...")
     remote_cards = get_cards(deck_id)
-    remote_by_id = {c['id']: c for c in remote_cards}
-
-    # Build content hash index for duplicate detection
-    remote_hashes = {}
-    for card in remote_cards:
-        q, a = parse_card(card['content'])
-        h = content_hash(q, a)
-        remote_hashes[h] = card['id']
+    remote_hash_by_id, remote_hashes = index_remote_cards(remote_cards)
 
     # Determine operations needed
     to_create = []
@@ -1139,13 +1517,9 @@ def sync(file_path, force=False):
 
         if card_id:
             # Card has ID - check if it exists remotely
-            if card_id in remote_by_id:
+            if card_id in remote_hash_by_id:
                 # Card exists remotely - check if update needed
-                remote_card = remote_by_id[card_id]
-                remote_q, remote_a = parse_card(remote_card['content'])
-                remote_hash = content_hash(remote_q, remote_a)
-
-                if local_card['content_hash'] != remote_hash:
+                if local_card['content_hash'] != remote_hash_by_id[card_id]:
                     to_update.append(local_card)
             else:
                 # Card has ID but doesn't exist remotely - was deleted remotely
@@ -1159,7 +1533,7 @@ def sync(file_path, force=False):
 
     # Find remote deletions to apply locally
     local_ids = {c['card_id'] for c in local_cards if c['card_id']}
-    remote_ids = set(remote_by_id.keys())
+    remote_ids = set(remote_hash_by_id.keys())
     to_delete_remotely = remote_ids - local_ids  # Cards in remote but not local
 
     # Handle duplicates
@@ -1196,47 +1570,12 @@ def sync(file_path, force=False):
         print("Aborted")
         return
 
-    # Apply changes
-    created_count = 0
-    updated_count = 0
-    deleted_remotely_count = 0
+    # Apply changes (create, update and delete remotely)
+    created_count, updated_count, deleted_remotely_count, failures = apply_remote_changes(
+        deck_id, to_create, to_update, to_delete_remotely, delete_label="Deleted remotely"
+    )
     deleted_locally_count = 0
 
-    # Create new cards remotely
-    for card in to_create:
-        content = f"{card['question']}\n---\n{card['answer']}"
-        kwargs = {}
-        if card['tags']:
-            kwargs['tags'] = card['tags']
-        if card['archived']:
-            kwargs['archived?'] = True
-
-        created = create_card(deck_id, content, **kwargs)
-        print(f"  ✓ Created {created['id']}: {card['question'][:50]}...")
-        created_count += 1
-
-        # Update card with new ID
-        card['card_id'] = created['id']
-
-    # Update existing cards remotely
-    for card in to_update:
-        content = f"{card['question']}\n---\n{card['answer']}"
-        kwargs = {'content': content}
-        if card['tags']:
-            kwargs['tags'] = card['tags']
-        if card.get('archived'):
-            kwargs['archived?'] = True
-
-        update_card(card['card_id'], **kwargs)
-        print(f"  ✓ Updated {card['card_id']}: {card['question'][:50]}...")
-        updated_count += 1
-
-    # Delete cards remotely that were removed locally
-    for card_id in to_delete_remotely:
-        delete_card(card_id)
-        print(f"  ✓ Deleted remotely {card_id}")
-        deleted_remotely_count += 1
-
     # Remove cards locally that were deleted remotely
     if to_delete_locally:
         cards_to_delete_ids = {card['card_id'] for card in to_delete_locally}
@@ -1245,9 +1584,7 @@ def sync(file_path, force=False):
         print(f"  ✓ Removed {deleted_locally_count} card(s) locally")
 
     # Write back local file with updates
-    with local_file.open('w', encoding='utf-8') as f:
-        for card in local_cards:
-            f.write(format_card_to_markdown(card) + '\n')
+    write_deck_file(local_file, local_cards)
 
     if created_count > 0 or deleted_locally_count > 0:
         print(f"\nℹ Updated {local_file}")
@@ -1256,6 +1593,80 @@ def sync(file_path, force=False):
             print(f"     Commit new IDs: git add {local_file.name} && git commit -m 'Sync: add card IDs'")
 
     print(f"\n✓ Sync completed: {created_count} created, {updated_count} updated, {deleted_remotely_count} deleted remotely, {deleted_locally_count} deleted locally")
+    report_failures(failures)
+
+
+async def gather_bounded(coros, limit):
+    """Run coroutines concurrently with at most `limit` in flight.
+
+    Args:
+        coros: Iterable of coroutines to run
+        limit: Maximum number of coroutines running at once
+
+    Returns:
+        List of results, in the same order as coros
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+def create_openrouter_client(async_client=True, max_connections=LLM_MAX_CONNECTIONS):
+    """Create an OpenAI-compatible client for OpenRouter.
+
+    Kept apart from the Mochi SESSION so OpenRouter credentials are never sent to Mochi.
+
+    Args:
+        async_client: If True, return an AsyncOpenAI client, otherwise a sync OpenAI client
+        max_connections: Connection pool size, matched to the caller's concurrency
+
+    Returns:
+        Client configured for OpenRouter with retries on transient failures
+    """
+    kwargs = {}
+    if async_client and HAS_H2:
+        # Multiplex concurrent calls over a single TLS connection
+        import httpx
+        kwargs['http_client'] = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=min(LLM_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+                max_connections=max_connections
+            ),
+            timeout=LLM_TIMEOUT
+        )
+
+    # Imported here: openai dominates startup time and most commands never call an LLM
+    from openai import OpenAI, AsyncOpenAI
+
+    client_class = AsyncOpenAI if async_client else OpenAI
+    return client_class(
+        api_key=OPENROUTER_API_KEY,
+        base_url=OPENROUTER_BASE_URL,
+        max_retries=API_MAX_RETRIES,
+        **kwargs
+    )
+
+
+def create_llm_rate_limiter(requests_per_minute=LLM_REQUESTS_PER_MINUTE):
+    """Create a token-bucket limiter for OpenRouter requests.
+
+    Keeps bursts of concurrent calls under the provider's rate limit instead of
+    relying on 429 retries. Create one per event loop (per asyncio.run).
+
+    Args:
+        requests_per_minute: Maximum requests started per rolling minute
+
+    Returns:
+        AsyncLimiter, or None if aiolimiter is not installed (no client-side limit)
+    """
+    if not HAS_AIOLIMITER:
+        return None
+    return AsyncLimiter(requests_per_minute, 60)
 
 
 def get_embedding(text, client):
@@ -1289,18 +1700,17 @@ def get_embeddings_batch(texts, client, batch_size=100):
     embeddings = []
 
     # Process in batches to respect API limits
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
+    for batch in batched(texts, batch_size):
         response = client.embeddings.create(
             model=EMBEDDING_MODEL,
-            input=batch
+            input=list(batch)
         )
         # Extract embeddings in the same order as input
         batch_embeddings = [item.embedding for item in response.data]
         embeddings.extend(batch_embeddings)
 
         # Progress indicator
-        print(f"  {min(i + batch_size, len(texts))}/{len(texts)} ", end='\r')
+        print(f"  {len(embeddings)}/{len(texts)} ", end='\r')
 
     return embeddings
 
@@ -1338,7 +1748,16 @@ def find_duplicate_pairs(cards, threshold=0.85):
     n = len(cards)
 
     # Use FAISS if available, otherwise fall back to brute force
+    faiss = None
     if HAS_FAISS:
+        try:
+            import numpy as np
+            import faiss
+        except ImportError:
+            # Installed but unusable (e.g. faiss built against another numpy major)
+            faiss = None
+
+    if faiss is not None:
         # Convert embeddings to numpy array
         embeddings = np.array([card['embedding'] for card in cards]).astype('float32')
         d = embeddings.shape[1]  # Dimension of embeddings
@@ -1479,7 +1898,7 @@ def classify_duplicate_pair(card1, card2, client, classification_cache=None):
         return error_result
 
 
-async def classify_duplicate_pair_async(card1, card2, client, classification_cache=None):
+async def classify_duplicate_pair_async(card1, card2, client, classification_cache=None, rate_limiter=None):
     """Async version: Use LLM to classify if cards are duplicates or complementary.
 
     Args:
@@ -1487,6 +1906,7 @@ async def classify_duplicate_pair_async(card1, card2, client, classification_cac
         card2: Second card dict with question and answer
         client: AsyncOpenAI client (configured for OpenRouter)
         classification_cache: Optional cache dict to store/retrieve results
+        rate_limiter: Optional AsyncLimiter acquired before the request (cache hits skip it)
 
     Returns:
         tuple: (classification, reasoning, cache_hit)
@@ -1515,12 +1935,13 @@ async def classify_duplicate_pair_async(card1, card2, client, classification_cac
             return cached[0], cached[1], True  # cache_hit = True
 
     try:
-        response = await client.chat.completions.create(
-            model=LLM_CLASSIFICATION_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=1024
-        )
+        async with rate_limiter or contextlib.nullcontext():
+            response = await client.chat.completions.create(
+                model=LLM_CLASSIFICATION_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                max_tokens=1024
+            )
 
         result = response.choices[0].message.content.strip()
 
@@ -1564,22 +1985,14 @@ def grade_card(card, client, grading_cache=None):
         reasoning: Explanation from LLM
         cache_hit: Boolean indicating if result was from cache
     """
-    prompt = QUALITY_GRADING_PROMPT_TEMPLATE.format(
-        question=card['question'],
-        answer=card['answer']
-    )
-
     # Check cache first
-    cache_key = None
     if grading_cache is not None:
-        cache_key = grading_cache_key(
-            card['question'], card['answer'], prompt
-        )
-        if cache_key in grading_cache:
-            # Return cached result (stored as [score, reasoning])
-            cached = grading_cache[cache_key]
+        cached = lookup_cached_grade(card, grading_cache)
+        if cached is not None:
             return cached[0], cached[1], True  # cache_hit = True
 
+    prompt = grading_prompt(card)
+
     try:
         response = client.chat.completions.create(
             model=CURATION_MODEL,
@@ -1607,8 +2020,8 @@ def grade_card(card, client, grading_cache=None):
                 reasoning = f"Invalid score format: {score_str.strip()}"
 
         # Store in cache
-        if grading_cache is not None and cache_key is not None:
-            grading_cache[cache_key] = [score, reasoning]
+        if grading_cache is not None:
+            store_cached_grade(card, grading_cache, score, reasoning)
 
         return score, reasoning, False  # cache_hit = False
 
@@ -1672,43 +2085,39 @@ def improve_card(card, score, reasoning, client):
         return None, None
 
 
-async def grade_card_async(card, client, grading_cache=None):
+async def grade_card_async(card, client, grading_cache=None, rate_limiter=None):
     """Async version: Grade a flashcard for quality using LLM.
 
     Args:
         card: Card dict with question and answer
         client: AsyncOpenAI client (configured for OpenRouter)
         grading_cache: Optional cache dict to store/retrieve results
+        rate_limiter: Optional AsyncLimiter acquired before the request (cache hits skip it)
 
     Returns:
-        tuple: (score, reasoning, cache_hit)
+        tuple: (score, reasoning, cache_hit, failure)
         score: Quality score from 0-10 (int)
         reasoning: Explanation from LLM
         cache_hit: Boolean indicating if result was from cache
+        failure: None on success, else 'rate_limited' (HTTP 429) or 'error'
+            (score is then a placeholder 5)
     """
-    prompt = QUALITY_GRADING_PROMPT_TEMPLATE.format(
-        question=card['question'],
-        answer=card['answer']
-    )
-
     # Check cache first
-    cache_key = None
     if grading_cache is not None:
-        cache_key = grading_cache_key(
-            card['question'], card['answer'], prompt
-        )
-        if cache_key in grading_cache:
-            # Return cached result (stored as [score, reasoning])
-            cached = grading_cache[cache_key]
-            return cached[0], cached[1], True  # cache_hit = True
+        cached = lookup_cached_grade(card, grading_cache)
+        if cached is not None:
+            return cached[0], cached[1], True, None  # cache_hit = True
+
+    prompt = grading_prompt(card)
 
     try:
-        response = await client.chat.completions.create(
-            model=CURATION_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=1024
-        )
+        async with rate_limiter or contextlib.nullcontext():
+            response = await client.chat.completions.create(
+                model=CURATION_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                max_tokens=1024
+            )
 
         result = response.choices[0].message.content.strip()
 
@@ -1729,18 +2138,20 @@ async def grade_card_async(card, client, grading_cache=None):
                 reasoning = f"Invalid score format: {score_str.strip()}"
 
         # Store in cache
-        if grading_cache is not None and cache_key is not None:
-            grading_cache[cache_key] = [score, reasoning]
+        if grading_cache is not None:
+            store_cached_grade(card, grading_cache, score, reasoning)
 
-        return score, reasoning, False  # cache_hit = False
+        return score, reasoning, False, None  # cache_hit = False
 
     except Exception as e:
-        error_result = (5, f"LLM request failed: {str(e)[:100]}", False)
+        # openai is already loaded here (the client raised); only 429s signal throttling
+        from openai import RateLimitError
+        failure = 'rate_limited' if isinstance(e, RateLimitError) else 'error'
         # Don't cache errors
-        return error_result
+        return 5, f"LLM request failed: {str(e)[:100]}", False, failure
 
 
-async def improve_card_async(card, score, reasoning, client):
+async def improve_card_async(card, score, reasoning, client, rate_limiter=None):
     """Async version: Generate improved version of a flashcard using LLM.
 
     Args:
@@ -1748,6 +2159,7 @@ async def improve_card_async(card, score, reasoning, client):
         score: Current quality score (0-10)
         reasoning: Issues identified by grading
         client: AsyncOpenAI client (configured for OpenRouter)
+        rate_limiter: Optional AsyncLimiter acquired before the request
 
     Returns:
         tuple: (improved_question, improved_answer)
@@ -1761,12 +2173,13 @@ async def improve_card_async(card, score, reasoning, client):
     )
 
     try:
-        response = await client.chat.completions.create(
-            model=CURATION_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,  # Slightly creative for improvements
-            max_tokens=2048
-        )
+        async with rate_limiter or contextlib.nullcontext():
+            response = await client.chat.completions.create(
+                model=CURATION_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,  # Slightly creative for improvements
+                max_tokens=2048
+            )
 
         result = response.choices[0].message.content.strip()
 
@@ -1792,12 +2205,13 @@ async def improve_card_async(card, score, reasoning, client):
         return None, None
 
 
-def dedupe(file_path=None, threshold=0.85):
+def dedupe(file_path=None, threshold=0.85, max_concurrency=PARALLEL_LLM_CALLS):
     """Find and remove duplicate cards from deck file(s) using semantic similarity.
 
     Args:
         file_path: Path to deck file (<deck-name>-<deck_id>.md). If None, dedupes across all deck files in current directory
         threshold: Similarity threshold for duplicates (default: 0.85)
+        max_concurrency: Maximum number of concurrent LLM calls (default: PARALLEL_LLM_CALLS)
     """
     # Load cards from single file or all files
     if file_path:
@@ -1823,7 +2237,7 @@ def dedupe(file_path=None, threshold=0.85):
     # Load all cards and track their source file
     all_cards = []
     for deck_file in deck_files:
-        cards = parse_markdown_cards(deck_file.read_text())
+        cards = load_deck_cards(deck_file)
         for card in cards:
             card['source_file'] = deck_file
         all_cards.extend(cards)
@@ -1847,7 +2261,7 @@ def dedupe(file_path=None, threshold=0.85):
 
     for idx, card in enumerate(cards):
         # Check if embedding is cached (using model-aware cache key)
-        cache_key = embedding_cache_key(card['content_hash'])
+        cache_key = embedding_cache_key(card['question'], card['answer'])
         if cache_key in embedding_cache:
             card['embedding'] = embedding_cache[cache_key]
             cache_hits += 1
@@ -1861,10 +2275,7 @@ def dedupe(file_path=None, threshold=0.85):
     # Generate embeddings for cards not in cache
     if cards_needing_embeddings:
         # Initialize OpenRouter client for embeddings
-        embedding_client = OpenAI(
-            api_key=OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
-        )
+        embedding_client = create_openrouter_client(async_client=False)
 
         print(f"\nGenerating embeddings for {len(cards_needing_embeddings)} new card(s)...")
         # Prepare texts for batch processing
@@ -1877,7 +2288,7 @@ def dedupe(file_path=None, threshold=0.85):
         for card, embedding in zip(cards_needing_embeddings, new_embeddings):
             card['embedding'] = embedding
             # Store in cache with model-aware key
-            cache_key = embedding_cache_key(card['content_hash'])
+            cache_key = embedding_cache_key(card['question'], card['answer'])
             embedding_cache[cache_key] = embedding
 
         # Save updated cache
@@ -1894,59 +2305,54 @@ def dedupe(file_path=None, threshold=0.85):
         return
 
     print(f"\nFound {len(pairs)} potential duplicate pair(s)")
-    print(f"Classifying with LLM (parallelized: {PARALLEL_LLM_CALLS} concurrent)...")
+    print(f"Classifying with LLM (parallelized: {max_concurrency} concurrent)...")
 
     # Load classification cache
     classification_cache = load_classification_cache()
     classification_cache_hits = 0
     classification_cache_misses = 0
 
-    # Classify pairs with LLM in parallel batches
+    # Classify pairs with LLM concurrently
+    classified_count = 0
+
+    async def classify_pair(i, j, async_client, rate_limiter):
+        nonlocal classified_count
+        result = await classify_duplicate_pair_async(
+            cards[i], cards[j], async_client, classification_cache, rate_limiter
+        )
+
+        # Update progress
+        classified_count += 1
+        print(f"  {classified_count}/{len(pairs)} classified", end='\r')
+        return result
+
     async def classify_pairs_async():
         nonlocal classification_cache_hits, classification_cache_misses
 
         # Initialize async OpenRouter client for classification
-        async_client = AsyncOpenAI(
-            api_key=OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
+        async_client = create_openrouter_client(max_connections=max_concurrency)
+        rate_limiter = create_llm_rate_limiter()
+
+        results = await gather_bounded(
+            (classify_pair(i, j, async_client, rate_limiter) for i, j, _ in pairs),
+            max_concurrency
         )
 
         classified_pairs = []
-        total = len(pairs)
-
-        # Process in batches of PARALLEL_LLM_CALLS
-        for batch_start in range(0, total, PARALLEL_LLM_CALLS):
-            batch_end = min(batch_start + PARALLEL_LLM_CALLS, total)
-            batch = pairs[batch_start:batch_end]
-
-            # Create async tasks for this batch
-            tasks = []
-            for i, j, score in batch:
-                task = classify_duplicate_pair_async(
-                    cards[i], cards[j], async_client, classification_cache
-                )
-                tasks.append((i, j, score, task))
-
-            # Wait for all tasks in this batch to complete
-            for i, j, score, task in tasks:
-                classification, reasoning, cache_hit = await task
-
-                # Track cache hits/misses during classification
-                if cache_hit:
-                    classification_cache_hits += 1
-                else:
-                    classification_cache_misses += 1
-
-                classified_pairs.append({
-                    'i': i,
-                    'j': j,
-                    'score': score,
-                    'classification': classification,
-                    'reasoning': reasoning
-                })
-
-            # Update progress
-            print(f"  {min(batch_end, total)}/{total} classified", end='\r')
+        for (i, j, score), (classification, reasoning, cache_hit) in zip(pairs, results):
+            # Track cache hits/misses during classification
+            if cache_hit:
+                classification_cache_hits += 1
+            else:
+                classification_cache_misses += 1
+
+            classified_pairs.append({
+                'i': i,
+                'j': j,
+                'score': score,
+                'classification': classification,
+                'reasoning': reasoning
+            })
 
         return classified_pairs
 
@@ -2093,12 +2499,11 @@ def dedupe(file_path=None, threshold=0.85):
         if len(cards_to_keep) < len(original_cards):
             files_modified.add(deck_file)
 
-            with deck_file.open('w', encoding='utf-8') as f:
-                for card in cards_to_keep:
-                    # Remove temporary fields before writing
-                    card.pop('embedding', None)
-                    card.pop('source_file', None)
-                    f.write(format_card_to_markdown(card) + '\n')
+            # Remove temporary fields before writing
+            for card in cards_to_keep:
+                card.pop('embedding', None)
+                card.pop('source_file', None)
+            write_deck_file(deck_file, cards_to_keep)
 
     print(f"\n✓ Removed {len(cards_to_remove)} duplicate(s)")
     print(f"✓ Modified {len(files_modified)} file(s):")
@@ -2112,7 +2517,7 @@ def dedupe(file_path=None, threshold=0.85):
         print(f"\nTip: Review changes with: git diff")
 
 
-def curate(file_path=None, threshold=8):
+def curate(file_path=None, threshold=8, auto_tune=False, max_concurrency=PARALLEL_LLM_CALLS, top=5):
     """Curate card content to meet quality standards.
 
     Grades each card for quality (0-10), then improves cards below threshold.
@@ -2120,6 +2525,9 @@ def curate(file_path=None, threshold=8):
     Args:
         file_path: Path to deck file (<deck-name>-<deck_id>.md). If None, curates all deck files in current directory
         threshold: Minimum quality score to keep unchanged (default: 8)
+        auto_tune: If True, pick grading concurrency from latency stats of previous runs
+        max_concurrency: Maximum number of concurrent LLM calls (default: PARALLEL_LLM_CALLS)
+        top: Number of lowest-scoring cards to show before asking to improve (default: 5)
     """
     # Load cards from single file or all files
     if file_path:
@@ -2145,7 +2553,7 @@ def curate(file_path=None, threshold=8):
     # Load all cards and track their source file
     all_cards = []
     for deck_file in deck_files:
-        cards = parse_markdown_cards(deck_file.read_text())
+        cards = load_deck_cards(deck_file)
         for card in cards:
             card['source_file'] = deck_file
         all_cards.extend(cards)
@@ -2160,56 +2568,77 @@ def curate(file_path=None, threshold=8):
     # Load grading cache
     print("Loading grading cache...")
     grading_cache = load_grading_cache()
-    grading_cache_hits = 0
-    grading_cache_misses = 0
 
-    # Grade all cards in parallel batches
-    print(f"\nGrading {len(cards)} card(s) for quality (parallelized: {PARALLEL_LLM_CALLS} concurrent)...")
+    # Pick grading concurrency (tuned from previous runs if requested)
+    parallel = max_concurrency
+    if auto_tune:
+        llm_stats = load_llm_stats()
+        parallel = tuned_parallelism(llm_stats, max_concurrency)
+
+    # Serve cached grades up front so only new or changed cards are sent to the LLM
+    grades = [lookup_cached_grade(card, grading_cache) for card in cards]
+    miss_indices = [idx for idx, grade in enumerate(grades) if grade is None]
+    grading_cache_hits = len(cards) - len(miss_indices)
+    grading_cache_misses = len(miss_indices)
+
+    # Grade uncached cards concurrently
+    print(f"\nGrading {len(miss_indices)} card(s) for quality "
+          f"({grading_cache_hits} cached, parallelized: {parallel} concurrent)...")
     cards_needing_improvement = []
+    meeting_standards_count = 0
+    grading_latencies = []
+    grading_rate_limited_count = 0
+
+    graded_count = 0
+    graded_score_total = 0
+
+    async def grade_one(card, async_client, rate_limiter):
+        nonlocal graded_count, graded_score_total
+        # Time only the request, not the wait on our own client-side rate limiter
+        async with rate_limiter or contextlib.nullcontext():
+            start = time.perf_counter()
+            # Cache hits were served above, so don't look the card up again
+            score, reasoning, _, failure = await grade_card_async(card, async_client)
+            elapsed = time.perf_counter() - start
+
+        # Update progress
+        graded_count += 1
+        graded_score_total += score
+        print(f"  {graded_count}/{len(miss_indices)} graded (avg: {graded_score_total / graded_count:.1f}/10)", end='\r')
+        return score, reasoning, elapsed, failure
 
     async def grade_cards_async():
-        nonlocal grading_cache_hits, grading_cache_misses
+        nonlocal grading_rate_limited_count
 
         # Initialize async OpenRouter client
-        async_client = AsyncOpenAI(
-            api_key=OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
-        )
-
-        total = len(cards)
-
-        # Process in batches of PARALLEL_LLM_CALLS
-        for batch_start in range(0, total, PARALLEL_LLM_CALLS):
-            batch_end = min(batch_start + PARALLEL_LLM_CALLS, total)
-            batch = cards[batch_start:batch_end]
-
-            # Create async tasks for this batch
-            tasks = []
-            for card in batch:
-                task = grade_card_async(card, async_client, grading_cache)
-                tasks.append((card, task))
-
-            # Wait for all tasks in this batch to complete
-            for card, task in tasks:
-                score, reasoning, cache_hit = await task
-                card['quality_score'] = score
-                card['quality_reasoning'] = reasoning
+        async_client = create_openrouter_client(max_connections=parallel)
+        rate_limiter = create_llm_rate_limiter()
 
-                # Track cache hits/misses during grading
-                if cache_hit:
-                    grading_cache_hits += 1
-                else:
-                    grading_cache_misses += 1
-
-                if score < threshold:
-                    cards_needing_improvement.append(card)
+        results = await gather_bounded(
+            (grade_one(cards[idx], async_client, rate_limiter) for idx in miss_indices), parallel
+        )
 
-            # Update progress
-            avg_score = sum(c['quality_score'] for c in batch) / len(batch) if batch else 0
-            print(f"  {min(batch_end, total)}/{total} graded (avg: {avg_score:.1f}/10)", end='\r')
+        for idx, (score, reasoning, elapsed, failure) in zip(miss_indices, results):
+            grades[idx] = (score, reasoning)
+            if failure is None:
+                # Only successful calls count towards latency stats and are cached
+                grading_latencies.append(elapsed)
+                store_cached_grade(cards[idx], grading_cache, score, reasoning)
+            elif failure == 'rate_limited':
+                grading_rate_limited_count += 1
 
     # Run async grading
-    asyncio.run(grade_cards_async())
+    if miss_indices:
+        asyncio.run(grade_cards_async())
+
+    for card, (score, reasoning) in zip(cards, grades):
+        # Only cards below threshold keep their grading; the rest are just counted
+        if score < threshold:
+            card['quality_score'] = score
+            card['quality_reasoning'] = reasoning
+            cards_needing_improvement.append(card)
+        else:
+            meeting_standards_count += 1
 
     # Save grading cache
     if grading_cache_misses > 0:
@@ -2218,15 +2647,21 @@ def curate(file_path=None, threshold=8):
 
     print(f"  Grading cache: {grading_cache_hits} hits, {grading_cache_misses} misses")
 
-    # Show score distribution
-    score_counts = {}
-    for card in cards:
-        score = card['quality_score']
-        score_counts[score] = score_counts.get(score, 0) + 1
+    # Record latency stats and tune concurrency for the next run
+    if auto_tune and (grading_latencies or grading_rate_limited_count):
+        history = llm_stats.get('latencies', [])
+        next_parallel = tune_parallelism(parallel, grading_latencies, grading_rate_limited_count, history)
+        save_llm_stats({
+            'parallel': next_parallel,
+            'latencies': (history + grading_latencies)[-LLM_STATS_WINDOW:]
+        })
+        median = f"{statistics.median(grading_latencies):.2f}s" if grading_latencies else "n/a"
+        print(f"  Median LLM latency: {median} "
+              f"({grading_rate_limited_count} rate limited), next run concurrency: {next_parallel}")
 
     print(f"\n✓ Grading complete")
     print(f"  Cards needing improvement (< {threshold}): {len(cards_needing_improvement)}")
-    print(f"  Cards meeting standards (>= {threshold}): {len(cards) - len(cards_needing_improvement)}")
+    print(f"  Cards meeting standards (>= {threshold}): {meeting_standards_count}")
 
     if not cards_needing_improvement:
         print("\n✓ All cards meet quality standards!")
@@ -2234,14 +2669,20 @@ def curate(file_path=None, threshold=8):
 
     # Show cards needing improvement
     print(f"\n{len(cards_needing_improvement)} card(s) below quality threshold:\n")
-    for idx, card in enumerate(cards_needing_improvement[:5], 1):  # Show first 5
+    # Show the worst cards first; a bounded heap avoids sorting every card for a short preview
+    by_score = operator.itemgetter('quality_score')
+    if top >= len(cards_needing_improvement):
+        worst_cards = sorted(cards_needing_improvement, key=by_score)
+    else:
+        worst_cards = heapq.nsmallest(top, cards_needing_improvement, key=by_score)
+    for idx, card in enumerate(worst_cards, 1):
         q_preview = card['question'][:60] + '...' if len(card['question']) > 60 else card['question']
         file_info = f" [{card['source_file'].name}]" if card.get('source_file') else ""
         print(f"  {idx}. Score {card['quality_score']}/10: {q_preview}{file_info}")
         print(f"     Issue: {card['quality_reasoning'][:80]}...")
 
-    if len(cards_needing_improvement) > 5:
-        print(f"  ... and {len(cards_needing_improvement) - 5} more")
+    if len(cards_needing_improvement) > len(worst_cards):
+        print(f"  ... and {len(cards_needing_improvement) - len(worst_cards)} more")
 
     # Ask user if they want to proceed with improvements
     print()
@@ -2250,50 +2691,45 @@ def curate(file_path=None, threshold=8):
         print("Aborted")
         return
 
-    # Improve cards below threshold in parallel batches
-    print(f"\nImproving {len(cards_needing_improvement)} card(s) (parallelized: {PARALLEL_LLM_CALLS} concurrent)...")
+    # Improve cards below threshold concurrently
+    print(f"\nImproving {len(cards_needing_improvement)} card(s) (parallelized: {max_concurrency} concurrent)...")
     improved_count = 0
     failed_count = 0
+    improve_done_count = 0
+
+    async def improve_one(card, async_client, rate_limiter):
+        nonlocal improve_done_count
+        result = await improve_card_async(
+            card, card['quality_score'], card['quality_reasoning'], async_client, rate_limiter
+        )
+
+        # Update progress
+        improve_done_count += 1
+        print(f"  {improve_done_count}/{len(cards_needing_improvement)} improved", end='\r')
+        return result
 
     async def improve_cards_async():
+        nonlocal improved_count, failed_count
+
         # Initialize async OpenRouter client
-        async_client = AsyncOpenAI(
-            api_key=OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
+        async_client = create_openrouter_client(max_connections=max_concurrency)
+        rate_limiter = create_llm_rate_limiter()
+
+        results = await gather_bounded(
+            (improve_one(card, async_client, rate_limiter) for card in cards_needing_improvement),
+            max_concurrency
         )
 
-        nonlocal improved_count, failed_count
-        total = len(cards_needing_improvement)
-
-        # Process in batches of PARALLEL_LLM_CALLS
-        for batch_start in range(0, total, PARALLEL_LLM_CALLS):
-            batch_end = min(batch_start + PARALLEL_LLM_CALLS, total)
-            batch = cards_needing_improvement[batch_start:batch_end]
-
-            # Create async tasks for this batch
-            tasks = []
-            for card in batch:
-                task = improve_card_async(
-                    card, card['quality_score'], card['quality_reasoning'], async_client
-                )
-                tasks.append((card, task))
-
-            # Wait for all tasks in this batch to complete
-            for card, task in tasks:
-                improved_q, improved_a = await task
-
-                if improved_q and improved_a:
-                    # Update card with improved content
-                    card['question'] = improved_q
-                    card['answer'] = improved_a
-                    # Update content hash for the improved card
-                    card['content_hash'] = content_hash(improved_q, improved_a)
-                    improved_count += 1
-                else:
-                    failed_count += 1
-
-            # Update progress
-            print(f"  {min(batch_end, total)}/{total} improved", end='\r')
+        for card, (improved_q, improved_a) in zip(cards_needing_improvement, results):
+            if improved_q and improved_a:
+                # Update card with improved content
+                card['question'] = improved_q
+                card['answer'] = improved_a
+                # Update content hash for the improved card
+                card['content_hash'] = content_hash(improved_q, improved_a)
+                improved_count += 1
+            else:
+                failed_count += 1
 
     # Run async improvement
     asyncio.run(improve_cards_async())
@@ -2308,6 +2744,9 @@ def curate(file_path=None, threshold=8):
             cards_by_file[source_file] = []
         cards_by_file[source_file].append(card)
 
+    # Files holding at least one improved card (collected before source_file is stripped)
+    improved_files = {card['source_file'] for card in cards_needing_improvement}
+
     # Write back to each modified file
     files_modified = set()
     for deck_file in deck_files:
@@ -2316,20 +2755,15 @@ def curate(file_path=None, threshold=8):
         if not cards_to_write:
             continue
 
-        # Check if any cards from this file were improved
-        file_cards = [c for c in cards if c.get('source_file') == deck_file]
-        file_improved = [c for c in file_cards if c in cards_needing_improvement]
-
-        if file_improved:
+        if deck_file in improved_files:
             files_modified.add(deck_file)
 
-            with deck_file.open('w', encoding='utf-8') as f:
-                for card in cards_to_write:
-                    # Remove temporary fields before writing
-                    card.pop('quality_score', None)
-                    card.pop('quality_reasoning', None)
-                    card.pop('source_file', None)
-                    f.write(format_card_to_markdown(card) + '\n')
+            # Remove temporary fields before writing
+            for card in cards_to_write:
+                card.pop('quality_score', None)
+                card.pop('quality_reasoning', None)
+                card.pop('source_file', None)
+            write_deck_file(deck_file, cards_to_write)
 
     print(f"\n✓ Updated {len(files_modified)} file(s):")
     for deck_file in sorted(files_modified):
@@ -2347,13 +2781,23 @@ def find_deck(decks, deck_name=None, deck_id=None):
     if deck_id:
         return next((d for d in decks if d['id'] == deck_id), None)
     if deck_name:
+        name_lower = deck_name.lower()
         return (next((d for d in decks if d['name'] == deck_name), None) or
-                next((d for d in decks if deck_name.lower() in d['name'].lower()), None))
+                next((d for d in decks if name_lower in d['name'].lower()), None))
     return next((d for d in decks if "AI/ML" in d["name"] or "AIML" in d["name"]), None)
 
 
-def parse_args():
-    """Parse command-line arguments."""
+def positive_int(value):
+    """Argparse type for integer options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+@functools.cache
+def _build_parser():
+    """Build the command-line parser (once per process)."""
     parser = argparse.ArgumentParser(description="Mochi flashcard management")
 
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
@@ -2379,13 +2823,26 @@ def parse_args():
     dedupe_parser.add_argument("file_path", nargs='?', help="Path to deck file (e.g., deck-python-abc123.md). If omitted, dedupes across all deck-*.md files in current directory")
     dedupe_parser.add_argument("--threshold", type=float, default=0.85,
                               help="Similarity threshold (0.0-1.0, default: 0.85)")
+    dedupe_parser.add_argument("--max-concurrency", type=positive_int, default=PARALLEL_LLM_CALLS,
+                              help=f"Maximum concurrent LLM calls (default: {PARALLEL_LLM_CALLS})")
 
     curate_parser = subparsers.add_parser("curate", help="Grade and improve card quality using LLM")
     curate_parser.add_argument("file_path", nargs='?', help="Path to deck file (e.g., deck-python-abc123.md). If omitted, curates all deck-*.md files in current directory")
     curate_parser.add_argument("--threshold", type=int, default=8,
                               help="Minimum quality score (0-10) to keep unchanged (default: 8)")
+    curate_parser.add_argument("--max-concurrency", type=positive_int, default=PARALLEL_LLM_CALLS,
+                              help=f"Maximum concurrent LLM calls (default: {PARALLEL_LLM_CALLS})")
+    curate_parser.add_argument("--auto-tune", action="store_true",
+                              help="Tune LLM concurrency from latency stats of previous runs")
+    curate_parser.add_argument("--top", type=positive_int, default=5,
+                              help="Number of lowest-scoring cards to show (default: 5)")
 
-    return parser.parse_args()
+    return parser
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    return _build_parser().parse_args()
 
 
 def main():
@@ -2476,12 +2933,13 @@ def main():
     elif args.command == "dedupe":
         # Load API key for dedupe command
         OPENROUTER_API_KEY = get_openrouter_api_key()
-        dedupe(file_path=args.file_path, threshold=args.threshold)
+        dedupe(file_path=args.file_path, threshold=args.threshold, max_concurrency=args.max_concurrency)
 
     elif args.command == "curate":
         # Load API key for curate command
         OPENROUTER_API_KEY = get_openrouter_api_key()
-        curate(file_path=args.file_path, threshold=args.threshold)
+        curate(file_path=args.file_path, threshold=args.threshold, auto_tune=args.auto_tune,
+               max_concurrency=args.max_concurrency, top=args.top)
 
     elif args.command is None:
         print("No command specified. Use --help to see available commands.")
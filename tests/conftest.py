@@ -0,0 +1,73 @@
+"""Shared fixtures for the mochimochi test suite."""
+
+import hashlib
+import os
+import pytest
+import main
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-integration", action="store_true", default=False,
+        help="run tests marked integration (they hit the live Mochi API)",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip live API tests at collection unless --run-integration and TEST_DECK_ID are set."""
+    if not config.getoption("--run-integration"):
+        skip_integration = pytest.mark.skip(reason="needs --run-integration")
+    elif not os.getenv("TEST_DECK_ID"):
+        skip_integration = pytest.mark.skip(reason="TEST_DECK_ID not set - skipping live API tests")
+    else:
+        return
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip_integration)
+
+
+# Canonical deck markdown: one card with ID, tags and archived flag, one new card
+CANONICAL_MD = """# Test Cards
+
+---
+card_id: abc123
+tags: ["python", "basics"]
+archived: false
+---
+What is Python?
+---
+A programming language
+---
+card_id: null
+---
+What is ML?
+---
+Machine Learning
+"""
+
+
+@pytest.fixture(scope="session")
+def parsed_sample_deck():
+    """Cards parsed once from CANONICAL_MD (shared across the session; do not mutate)."""
+    return main.parse_markdown_cards(CANONICAL_MD)
+
+
+@pytest.fixture(scope="session")
+def deck_file_factory(tmp_path_factory):
+    """Return a function writing (filename, content bytes) to a deck file once per session.
+
+    Identical pairs return the same prewritten Path, so only use it for tests
+    that read the file (validation, parsing); commands that rewrite the deck
+    need their own tmp_path copy.
+    """
+    deck_files = {}
+
+    def make(filename, content):
+        key = (filename, hashlib.blake2b(content).digest())
+        if key not in deck_files:
+            deck_file = tmp_path_factory.mktemp("decks") / filename
+            deck_file.write_bytes(content)
+            deck_files[key] = deck_file
+        return deck_files[key]
+
+    return make
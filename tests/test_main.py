@@ -1,113 +1,208 @@
 #!/usr/bin/env python3
-"""Test suite for mochimochi."""
+"""Test suite for mochimochi.
 
+Running this file directly disables the cache provider plugin; the regular
+`pytest` entry point (and CI) keeps the full plugin set.
+"""
+
+import asyncio
 import os
+import re
+import subprocess
+import sys
+from pathlib import Path, PurePath
+from types import MappingProxyType, SimpleNamespace
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+import requests
 import main
 
 
-@pytest.fixture
-def mock_env():
-    """Mock environment variables."""
-    with patch.dict(os.environ, {
-        'MOCHI_API_KEY': 'test_api_key'
-    }):
-        yield
-
-
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_decks():
-    """Sample deck data."""
-    return [
-        {'id': 'deck1', 'name': 'AI/ML Deck'},
-        {'id': 'deck2', 'name': 'Python Programming'},
-        {'id': 'deck3', 'name': 'General Knowledge'}
-    ]
+    """Sample deck data (shared and read-only)."""
+    return (
+        MappingProxyType({'id': 'deck1', 'name': 'AI/ML Deck'}),
+        MappingProxyType({'id': 'deck2', 'name': 'Python Programming'}),
+        MappingProxyType({'id': 'deck3', 'name': 'General Knowledge'}),
+    )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_cards():
-    """Sample card data."""
-    return [
-        {
+    """Sample card data (shared and read-only)."""
+    return (
+        MappingProxyType({
             'id': 'card1',
             'content': 'What is Python?\n---\nA programming language'
-        },
-        {
+        }),
+        MappingProxyType({
             'id': 'card2',
             'content': 'What is ML?\n---\nMachine Learning'
-        }
-    ]
+        }),
+    )
 
 
-class TestParseCard:
-    """Test card parsing utility."""
+# Deck used by the live API tests (conftest.py skips them when unset)
+TEST_DECK_ID = os.getenv('TEST_DECK_ID')
 
-    def test_parse_card_with_separator(self):
-        content = "What is Python?\n---\nA programming language"
-        question, answer = main.parse_card(content)
-        assert question == "What is Python?"
-        assert answer == "A programming language"
+# Golden content_hash of ("What is Python?", "A programming language")
+PYTHON_CARD_HASH = "3eccca424b5d9917"
 
-    def test_parse_card_without_separator(self):
-        content = "Just a question"
-        question, answer = main.parse_card(content)
-        assert question == "Just a question"
-        assert answer == ""
+# Golden embedding_cache_key of the same card; must never change, or every
+# cached embedding in ~/.mochimochi/cache/embeddings.json is orphaned
+PYTHON_CARD_EMBEDDING_KEY = "558f08022b380935"
 
-    def test_parse_card_empty(self):
-        question, answer = main.parse_card("")
-        assert question == ""
-        assert answer == ""
 
-    def test_parse_card_with_extra_separators(self):
-        content = "Question?\n---\nAnswer part 1\n---\nAnswer part 2"
-        question, answer = main.parse_card(content)
-        assert question == "Question?"
-        assert answer == "Answer part 1\n---\nAnswer part 2"
+def card_md(card_id, question, answer):
+    """Build one deck card block as bytes (card_id None is written as null)."""
+    return f"---\ncard_id: {card_id or 'null'}\n---\n{question}\n---\n{answer}\n".encode('utf-8')
 
 
-class TestFindDeck:
-    """Test deck finding logic."""
+# Deck files used by the sync/push command tests, assembled from shared card blocks
+CARD1_MD, CARD2_MD, CARD3_MD = (card_md(f"card{n}", f"Question {n}", f"Answer {n}") for n in (1, 2, 3))
 
-    def test_find_deck_by_id(self, sample_decks):
-        deck = main.find_deck(sample_decks, deck_id='deck2')
-        assert deck['id'] == 'deck2'
-        assert deck['name'] == 'Python Programming'
+THREE_CARD_DECK_MD = b"".join((CARD1_MD, CARD2_MD, CARD3_MD))
 
-    def test_find_deck_by_exact_name(self, sample_decks):
-        deck = main.find_deck(sample_decks, deck_name='Python Programming')
-        assert deck['id'] == 'deck2'
+# THREE_CARD_DECK_MD parsed once at import; tests compare against it instead of re-parsing
+EXPECTED_THREE_CARDS = tuple(main.parse_markdown_cards(THREE_CARD_DECK_MD.decode('utf-8')))
+
+TWO_CARD_DECK_MD = CARD1_MD + CARD2_MD
+ONE_CARD_DECK_MD = CARD1_MD
+UPDATED_CARD_DECK_MD = card_md("card1", "Updated Question", "Updated Answer")
+NEW_CARD_DECK_MD = card_md(None, "New Question", "New Answer")
+NEW_DECK_MD = card_md(None, "Question", "Answer")
+MISSING_CARD_DECK_MD = card_md("missing_card", "Question", "Answer")
+
+# Error reports checked in one pass over the captured output (messages appear in this order)
+NEW_DECK_SYNC_ERROR = re.compile(r"Cannot sync new deck file.*Use 'push' command", re.DOTALL)
+PUSH_INCONSISTENCY_ERROR = re.compile(r"Data inconsistency detected.*use 'sync' command", re.DOTALL)
+
+# Valid deck files: (filename, content bytes, expected questions, expected deck ID)
+VALID_DECK_FILES = [
+    pytest.param("deck-test-Abc12345.md", b"""---
+card_id: card1
+tags: ["python"]
+---
+What is Python?
+---
+A programming language
+---
+card_id: null
+---
+What is ML?
+---
+Machine Learning
+""", ['What is Python?', 'What is ML?'], 'Abc12345', id="existing-deck"),
+    pytest.param("deck-multi-Abc12345.md", b"""---
+card_id: card1
+tags: ["tag1", "tag2"]
+archived: false
+---
+Question 1?
+---
+Answer 1
+---
+card_id: card2
+tags: []
+---
+Question 2?
+---
+Answer 2
+---
+card_id: null
+---
+Question 3?
+---
+Answer 3
+""", ['Question 1?', 'Question 2?', 'Question 3?'], 'Abc12345', id="multiple-cards"),
+    pytest.param("deck-mynewdeck.md", b"""---
+card_id: null
+tags: ["python"]
+---
+What is Python?
+---
+A programming language
+---
+card_id: null
+---
+What is ML?
+---
+Machine Learning
+""", ['What is Python?', 'What is ML?'], None, id="new-deck"),
+    pytest.param("deck-test-Abc12345.md", THREE_CARD_DECK_MD,
+                 [card['question'] for card in EXPECTED_THREE_CARDS], 'Abc12345', id="three-cards"),
+]
+
+
+# Invalid deck files: (filename, content bytes or None to leave the file missing,
+# expected exception, accepted messages). Empty questions/answers may also be
+# dropped by the parser, leaving "no cards".
+VALIDATION_ERRORS = [
+    pytest.param("deck-nonexistent-abc123.md", None, FileNotFoundError, ("not found",), id="not-found"),
+    pytest.param("deck-empty-abc123.md", b"", ValueError, ("empty",), id="empty"),
+    pytest.param("deck-whitespace-abc123.md", b"   \n\n  \n  ", ValueError, ("empty",), id="whitespace-only"),
+    pytest.param("invalid.md", b"---\ncard_id: card1\n---\nQuestion?\n---\nAnswer\n",
+                 ValueError, ("filename format",), id="invalid-filename"),
+    pytest.param("deck-nocards-abc123.md", b"# Just a header\n\nSome text but no cards",
+                 ValueError, ("no cards",), id="no-cards"),
+    pytest.param("deck-badcard-abc123.md", b"---\ncard_id: card1\n---\n\n---\nThis has an answer but no question\n",
+                 ValueError, ("no cards", "empty question"), id="empty-question"),
+    pytest.param("deck-badcard-abc123.md", b"---\ncard_id: card1\n---\nThis has a question\n---\n\n",
+                 ValueError, ("no cards", "empty answer"), id="empty-answer"),
+]
+
+
+# Card contents: (content, expected question, expected answer)
+PARSE_CARD_CASES = [
+    pytest.param("What is Python?\n---\nA programming language",
+                 "What is Python?", "A programming language", id="with-separator"),
+    pytest.param("Just a question", "Just a question", "", id="without-separator"),
+    pytest.param("", "", "", id="empty"),
+    pytest.param("Question?\n---\nAnswer part 1\n---\nAnswer part 2",
+                 "Question?", "Answer part 1\n---\nAnswer part 2", id="extra-separators"),
+    pytest.param("\n  Question?  \n---\n\n  Answer  \n\n",
+                 "Question?", "Answer", id="surrounding-whitespace"),
+    # Large whitespace runs must parse in linear time
+    pytest.param(" \n\t" * 20000, "", "", id="long-whitespace-only"),
+    pytest.param("Question?" + " \n" * 20000 + "---" + " \n" * 20000,
+                 "Question?", "", id="long-whitespace-around-separator"),
+]
 
-    def test_find_deck_by_partial_name(self, sample_decks):
-        deck = main.find_deck(sample_decks, deck_name='python')
-        assert deck['id'] == 'deck2'
 
-    def test_find_deck_default_aiml(self, sample_decks):
-        deck = main.find_deck(sample_decks)
-        assert deck['id'] == 'deck1'
-        assert 'AI/ML' in deck['name']
+class TestParseCard:
+    """Test card parsing utility."""
 
-    def test_find_deck_not_found(self, sample_decks):
-        deck = main.find_deck(sample_decks, deck_name='Nonexistent')
-        assert deck is None
+    @pytest.mark.parametrize("content,expected_question,expected_answer", PARSE_CARD_CASES)
+    def test_parse_card(self, content, expected_question, expected_answer):
+        assert main.parse_card(content) == (expected_question, expected_answer)
 
-    def test_find_deck_id_not_found(self, sample_decks):
-        deck = main.find_deck(sample_decks, deck_id='invalid')
-        assert deck is None
 
+class TestFindDeck:
+    """Test deck finding logic."""
 
+    @pytest.mark.parametrize("kwargs,expected_id", [
+        pytest.param({'deck_id': 'deck2'}, 'deck2', id="by-id"),
+        pytest.param({'deck_name': 'Python Programming'}, 'deck2', id="by-exact-name"),
+        pytest.param({'deck_name': 'python'}, 'deck2', id="by-partial-name"),
+        pytest.param({}, 'deck1', id="default-aiml"),
+        pytest.param({'deck_name': 'Nonexistent'}, None, id="name-not-found"),
+        pytest.param({'deck_id': 'invalid'}, None, id="id-not-found"),
+    ])
+    def test_find_deck(self, sample_decks, kwargs, expected_id):
+        deck = main.find_deck(sample_decks, **kwargs)
+        assert (deck['id'] if deck else None) == expected_id
+
+
+# Live tests share deck state on Mochi's server, so keep them on one xdist worker
+@pytest.mark.xdist_group("mochi_live")
 class TestCRUDOperations:
     """Test CRUD operations against live API."""
 
     @pytest.fixture
     def test_deck_id(self):
-        """Get a test deck ID from environment or skip test."""
-        deck_id = os.getenv('TEST_DECK_ID')
-        if not deck_id:
-            pytest.skip("TEST_DECK_ID not set - skipping live API tests")
-        return deck_id
+        """Test deck ID from the environment."""
+        return TEST_DECK_ID
 
     @pytest.mark.integration
     def test_card_lifecycle(self, test_deck_id):
@@ -151,62 +246,396 @@ class TestCRUDOperations:
         assert isinstance(cards, list)
 
 
+def canned_response(payload, status_code=200):
+    """Build a requests.Response carrying a JSON payload."""
+    response = main.requests.Response()
+    response.status_code = status_code
+    response._content = main.encode_json(payload)
+    return response
+
+
+class ReplaySession:
+    """Stand-in for main.SESSION that replays canned responses in request order."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def _replay(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+    def get(self, url, **kwargs):
+        return self._replay('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._replay('POST', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._replay('DELETE', url, **kwargs)
+
+
+class TestCRUDReplay:
+    """Offline versions of the live CRUD tests, replaying recorded API responses."""
+
+    def test_card_lifecycle(self, monkeypatch):
+        session = ReplaySession([
+            canned_response({'id': 'card1', 'content': 'Test question?\n---\nTest answer'}),
+            canned_response({'id': 'card1', 'content': 'Updated question?\n---\nUpdated answer'}),
+            canned_response({}),
+        ])
+        monkeypatch.setattr(main, 'SESSION', session)
+
+        card = main.create_card('deck1', "Test question?\n---\nTest answer")
+        assert card['id'] == 'card1'
+        assert main.update_card('card1', content="Updated question?\n---\nUpdated answer")['id'] == 'card1'
+        assert main.delete_card('card1') is True
+
+        assert [(method, url) for method, url, _ in session.calls] == [
+            ('POST', f"{main.BASE_URL}/cards/"),
+            ('POST', f"{main.BASE_URL}/cards/card1"),
+            ('DELETE', f"{main.BASE_URL}/cards/card1"),
+        ]
+        assert main.decode_json(session.calls[0][2]['data'])['deck-id'] == 'deck1'
+
+    def test_get_decks(self, monkeypatch):
+        monkeypatch.setattr(main, 'SESSION', ReplaySession([
+            canned_response({'docs': [{'id': 'deck1', 'name': 'AI/ML Deck'}]}),
+        ]))
+
+        decks = main.get_decks()
+        assert decks == [{'id': 'deck1', 'name': 'AI/ML Deck'}]
+
+    def test_get_cards_follows_bookmarks(self, monkeypatch):
+        session = ReplaySession([
+            canned_response({'docs': [{'id': 'card1'}], 'bookmark': 'page2'}),
+            canned_response({'docs': [{'id': 'card2'}], 'bookmark': 'page3'}),
+            canned_response({'docs': []}),
+        ])
+        monkeypatch.setattr(main, 'SESSION', session)
+
+        cards = main.get_cards('deck1', limit=1)
+        assert [card['id'] for card in cards] == ['card1', 'card2']
+        assert session.calls[1][2]['params']['bookmark'] == 'page2'
+
+    def test_http_errors_propagate(self, monkeypatch):
+        monkeypatch.setattr(main, 'SESSION', ReplaySession([canned_response({}, status_code=404)]))
+
+        with pytest.raises(main.requests.HTTPError):
+            main.delete_card('missing')
+
+
+class TestSession:
+    """Test shared HTTP session configuration."""
+
+    def test_session_retries_transient_errors(self):
+        """Test that the session retries rate limits and server errors."""
+        retry = main.SESSION.get_adapter(main.BASE_URL).max_retries
+        assert retry.total == main.API_MAX_RETRIES
+        assert 429 in retry.status_forcelist
+        assert 503 in retry.status_forcelist
+        assert retry.respect_retry_after_header
+
+    def test_session_retries_post_only_when_rate_limited(self):
+        """Test that non-idempotent POSTs are only resent after a 429."""
+        retry = main.SESSION.get_adapter(main.BASE_URL).max_retries
+        assert retry.is_retry('POST', 429)
+        assert not retry.is_retry('POST', 503)
+        assert retry.is_retry('GET', 503)
+        assert retry.is_retry('DELETE', 502)
+
+        error = ConnectTimeoutError()
+        assert retry.increment('GET', main.BASE_URL, error=error).total == retry.total - 1
+        with pytest.raises(MaxRetryError):
+            retry.increment('POST', main.BASE_URL, error=error)
+
+    def test_session_requests_json(self):
+        """Test that the session asks for JSON responses."""
+        assert main.SESSION.headers['Accept'] == 'application/json'
+
+
+class TestTuneParallelism:
+    """Test AIMD concurrency tuning for LLM calls."""
+
+    def test_tune_parallelism_increases_when_healthy(self):
+        assert main.tune_parallelism(10, [1.0, 1.2], 0, [1.0, 1.1]) == 11
+
+    def test_tune_parallelism_halves_on_errors(self):
+        assert main.tune_parallelism(10, [1.0], 3, [1.0]) == 5
+        assert main.tune_parallelism(1, [1.0], 1, []) == 1
+
+    def test_tune_parallelism_holds_when_latency_degrades(self):
+        assert main.tune_parallelism(10, [3.0, 3.5], 0, [1.0, 1.2]) == 10
+
+    def test_tune_parallelism_capped(self):
+        assert main.tune_parallelism(main.MAX_PARALLEL_LLM_CALLS, [1.0], 0, []) == main.MAX_PARALLEL_LLM_CALLS
+
+    @pytest.mark.parametrize("stats,expected", [
+        pytest.param({'parallel': 3}, 3, id="stored-below-cap"),
+        pytest.param({'parallel': 40}, 4, id="clamped-to-max-concurrency"),
+        pytest.param({}, 4, id="no-stats"),
+        pytest.param({'parallel': 0}, 4, id="non-positive"),
+        pytest.param({'parallel': '8'}, 4, id="not-an-int"),
+        pytest.param({'parallel': True}, 4, id="bool"),
+    ])
+    def test_tuned_parallelism_respects_max_concurrency(self, stats, expected):
+        assert main.tuned_parallelism(stats, 4) == expected
+
+
+def stub_llm_client(create):
+    """AsyncOpenAI-shaped client whose chat.completions.create is the given coroutine function."""
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def llm_reply(content):
+    """Chat completion response carrying the given message content."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def rate_limit_error():
+    """openai.RateLimitError as raised for an HTTP 429 from OpenRouter."""
+    import openai
+    response = SimpleNamespace(request=None, status_code=429, headers={})
+    return openai.RateLimitError("Rate limit exceeded", response=response, body=None)
+
+
+class TestGradeCardAsync:
+    """Test async LLM grading results."""
+
+    @pytest.mark.parametrize("error,failure", [
+        pytest.param(TimeoutError("timed out"), 'error', id="timeout"),
+        pytest.param(rate_limit_error(), 'rate_limited', id="rate-limited"),
+    ])
+    def test_grade_card_async_reports_failures(self, error, failure):
+        async def create(**kwargs):
+            raise error
+
+        card = {'question': 'What is Python?', 'answer': 'A programming language'}
+        grading_cache = {}
+        result = asyncio.run(main.grade_card_async(card, stub_llm_client(create), grading_cache))
+
+        assert result[2:] == (False, failure)
+        assert grading_cache == {}
+
+    def test_grade_card_async_success_is_not_failed(self):
+        async def create(**kwargs):
+            return llm_reply("8 | Clear and atomic")
+
+        card = {'question': 'What is Python?', 'answer': 'A programming language'}
+        result = asyncio.run(main.grade_card_async(card, stub_llm_client(create)))
+
+        assert result == (8, 'Clear and atomic', False, None)
+
+    def test_grade_card_async_uses_shared_cache_helpers(self):
+        """Test that fresh grades land where lookup_cached_grade finds them and are then served from cache."""
+        calls = 0
+
+        async def create(**kwargs):
+            nonlocal calls
+            calls += 1
+            return llm_reply("8 | Clear and atomic")
+
+        card = {'question': 'What is Python?', 'answer': 'A programming language'}
+        grading_cache = {}
+        asyncio.run(main.grade_card_async(card, stub_llm_client(create), grading_cache))
+
+        assert main.lookup_cached_grade(card, grading_cache) == (8, 'Clear and atomic')
+        result = asyncio.run(main.grade_card_async(card, stub_llm_client(create), grading_cache))
+        assert result == (8, 'Clear and atomic', True, None)
+        assert calls == 1
+
+
+class TestCurateAutoTune:
+    """Test that curate --auto-tune only backs off when the provider rate limits."""
+
+    @pytest.fixture
+    def saved_stats(self, monkeypatch):
+        saved = {}
+        monkeypatch.setattr(main, 'load_grading_cache', dict)
+        monkeypatch.setattr(main, 'save_grading_cache', lambda cache: None)
+        monkeypatch.setattr(main, 'load_llm_stats', lambda: {'parallel': 4})
+        monkeypatch.setattr(main, 'save_llm_stats', saved.update)
+        monkeypatch.setattr(main, 'create_llm_rate_limiter', lambda: None)
+        monkeypatch.setattr('builtins.input', lambda prompt='': 'n')
+        return saved
+
+    def run_curate(self, monkeypatch, tmp_path, error):
+        async def create(messages, **kwargs):
+            if 'Question 2' in messages[0]['content']:
+                raise error
+            return llm_reply("9 | Clear")
+
+        monkeypatch.setattr(main, 'create_openrouter_client', lambda **kwargs: stub_llm_client(create))
+        deck_file = tmp_path / "deck-test-Abc12345.md"
+        deck_file.write_bytes(TWO_CARD_DECK_MD)
+        main.curate(str(deck_file), auto_tune=True, max_concurrency=8)
+
+    def test_non_rate_limit_failures_do_not_back_off(self, monkeypatch, tmp_path, saved_stats):
+        self.run_curate(monkeypatch, tmp_path, TimeoutError("timed out"))
+
+        assert saved_stats['parallel'] == 5
+        assert len(saved_stats['latencies']) == 1  # the failed call is left out
+
+    def test_rate_limits_back_off(self, monkeypatch, tmp_path, saved_stats):
+        self.run_curate(monkeypatch, tmp_path, rate_limit_error())
+
+        assert saved_stats['parallel'] == 2
+
+
+class TestGatherBounded:
+    """Test bounded concurrent execution of coroutines."""
+
+    def test_gather_bounded_limits_concurrency_and_keeps_order(self):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def work(value):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01 * (5 - value))
+            in_flight -= 1
+            return value * 2
+
+        results = asyncio.run(main.gather_bounded((work(v) for v in range(5)), 2))
+
+        assert results == [0, 2, 4, 6, 8]
+        assert max_in_flight == 2
+
+
+class TestBatched:
+    """Test fixed-size chunking of iterables."""
+
+    def test_batched_yields_tuples_with_short_tail(self):
+        assert list(main.batched(range(5), 2)) == [(0, 1), (2, 3), (4,)]
+        assert list(main.batched([], 3)) == []
+
+
+class TestLLMRateLimiter:
+    """Test the optional client-side LLM rate limiter."""
+
+    def test_no_limiter_without_aiolimiter(self, monkeypatch):
+        monkeypatch.setattr(main, 'HAS_AIOLIMITER', False)
+        assert main.create_llm_rate_limiter() is None
+
+
+class TestBulkCardCalls:
+    """Test concurrent bulk card operations."""
+
+    def test_update_cards_bulk_collects_failures(self, monkeypatch):
+        def fake_update(card_id, **kwargs):
+            if card_id == 'bad':
+                raise main.requests.HTTPError("500 Server Error")
+            return {'id': card_id, **kwargs}
+
+        updates = [('a', {'content': 'A'}), ('bad', {'content': 'B'}), ('c', {'content': 'C'})]
+        monkeypatch.setattr(main, 'update_card', fake_update)
+        successes, failures = main.update_cards_bulk(updates)
+
+        assert [index for index, _ in successes] == [0, 2]
+        assert successes[1][1] == {'id': 'c', 'content': 'C'}
+        assert [index for index, _ in failures] == [1]
+        assert isinstance(failures[0][1], main.requests.HTTPError)
+
+    def test_bulk_with_no_items_makes_no_calls(self, monkeypatch):
+        def unexpected_delete(card_id):
+            raise AssertionError("delete_card should not be called")
+
+        monkeypatch.setattr(main, 'delete_card', unexpected_delete)
+        assert main.delete_cards_bulk([]) == ([], [])
+
+
+class TestFindDuplicatePairs:
+    """Test similar-card detection."""
+
+    def test_broken_faiss_install_falls_back_to_brute_force(self, monkeypatch, capsys):
+        """Test that an installed but unimportable faiss uses the brute-force search."""
+        monkeypatch.setattr(main, 'HAS_FAISS', True)
+        monkeypatch.setitem(sys.modules, 'faiss', None)  # import faiss raises ImportError
+        cards = [{'embedding': [1.0, 0.0]}, {'embedding': [0.0, 1.0]}, {'embedding': [1.0, 0.01]}]
+
+        pairs = main.find_duplicate_pairs(cards, threshold=0.9)
+
+        assert [(i, j) for i, j, _ in pairs] == [(0, 2)]
+        assert 'brute force' in capsys.readouterr().out
+
+
+# Command lines (without the program name) and the parsed attributes they must produce
+PARSE_ARGS_CASES = [
+    pytest.param(['pull', 'abc123'], {'command': 'pull', 'deck_id': 'abc123'}, id="pull"),
+    pytest.param(['push', 'deck-test-abc123.md', '--force'],
+                 {'command': 'push', 'file_path': 'deck-test-abc123.md', 'force': True}, id="push-force"),
+    pytest.param(['curate', 'deck.md'], {'command': 'curate', 'top': 5}, id="curate-default-top"),
+    pytest.param(['curate', 'deck.md', '--top', '20'], {'command': 'curate', 'top': 20}, id="curate-top"),
+]
+
+
 class TestCLI:
     """Test CLI argument parsing."""
 
-    def test_parse_args_pull(self):
-        """Test pull command parsing."""
-        with patch('sys.argv', ['main.py', 'pull', 'abc123']):
-            args = main.parse_args()
-            assert args.command == 'pull'
-            assert args.deck_id == 'abc123'
-
-    def test_parse_args_push_with_force(self):
-        """Test push command with force flag."""
-        with patch('sys.argv', ['main.py', 'push', 'deck-test-abc123.md', '--force']):
-            args = main.parse_args()
-            assert args.command == 'push'
-            assert args.file_path == 'deck-test-abc123.md'
-            assert args.force is True
+    @pytest.mark.parametrize("argv,expected", PARSE_ARGS_CASES)
+    def test_parse_args(self, monkeypatch, argv, expected):
+        """Test subcommand, argument and option parsing."""
+        monkeypatch.setattr(sys, 'argv', ['main.py', *argv])
+        args = main.parse_args()
+        assert {key: getattr(args, key) for key in expected} == expected
+
+    @pytest.mark.parametrize("top", ["0", "-3", "two"])
+    def test_parse_args_rejects_non_positive_top(self, monkeypatch, capsys, top):
+        """Test that curate --top must be a positive integer."""
+        monkeypatch.setattr(sys, 'argv', ['main.py', 'curate', 'deck.md', '--top', top])
+        with pytest.raises(SystemExit):
+            main.parse_args()
+        assert '--top' in capsys.readouterr().err
+
+    @pytest.mark.parametrize("command", ["curate", "dedupe"])
+    @pytest.mark.parametrize("value", ["0", "-3"])
+    def test_parse_args_rejects_non_positive_max_concurrency(self, monkeypatch, capsys, command, value):
+        """Test that --max-concurrency must be a positive integer (0 would hang the LLM pool)."""
+        monkeypatch.setattr(sys, 'argv', ['main.py', command, '--max-concurrency', value])
+        with pytest.raises(SystemExit):
+            main.parse_args()
+        assert '--max-concurrency' in capsys.readouterr().err
+
+    def test_parser_is_built_once(self):
+        """Test that repeated parse_args calls reuse the same parser."""
+        assert main._build_parser() is main._build_parser()
+
+    def test_import_does_not_load_openai(self):
+        """Test that importing main defers the openai and h2 imports until an LLM client is needed."""
+        code = "import sys, main; sys.exit('openai' in sys.modules or 'h2' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=Path(main.__file__).parent)
+        assert result.returncode == 0
 
 
 class TestSyncFunctions:
     """Test sync-related utility functions."""
 
     def test_content_hash(self):
-        """Test content hashing."""
-        q1, a1 = "What is Python?", "A programming language"
-        q2, a2 = "What is Python?", "A programming language"
-        q3, a3 = "What is ML?", "Machine Learning"
+        """Test content hashing against a known digest."""
+        assert main.content_hash("What is Python?", "A programming language") == PYTHON_CARD_HASH
+        assert main.content_hash("What is ML?", "Machine Learning") != PYTHON_CARD_HASH
 
-        hash1 = main.content_hash(q1, a1)
-        hash2 = main.content_hash(q2, a2)
-        hash3 = main.content_hash(q3, a3)
+    def test_content_hash_is_memoized(self):
+        """Test that repeated hashes of the same card are served from the cache."""
+        main.content_hash("What is Python?", "A programming language")
+        hits = main.content_hash.cache_info().hits
 
-        assert hash1 == hash2  # Same content = same hash
-        assert hash1 != hash3  # Different content = different hash
-        assert len(hash1) == 16  # Hash should be 16 chars
+        assert main.content_hash("What is Python?", "A programming language") == PYTHON_CARD_HASH
+        assert main.content_hash.cache_info().hits == hits + 1
 
-    def test_parse_markdown_cards(self):
-        """Test parsing markdown cards with frontmatter."""
-        markdown = """# Test Cards
+    def test_content_hash_separates_question_and_answer(self):
+        """Test that moving text across the question/answer boundary changes the hash."""
+        assert main.content_hash("ab", "c") != main.content_hash("a", "bc")
 
----
-card_id: abc123
-tags: ["python", "basics"]
-archived: false
----
-What is Python?
----
-A programming language
----
-card_id: null
----
-What is ML?
----
-Machine Learning
-"""
-        cards = main.parse_markdown_cards(markdown)
+    def test_embedding_cache_key_is_stable(self):
+        """Test that embedding cache keys don't depend on the content_hash scheme."""
+        assert main.embedding_cache_key("What is Python?", "A programming language") == PYTHON_CARD_EMBEDDING_KEY
+        assert main.embedding_cache_key("What is Python?", "A programming language", model="other") != PYTHON_CARD_EMBEDDING_KEY
+
+    def test_parse_markdown_cards(self, parsed_sample_deck):
+        """Test parsing markdown cards with frontmatter."""
+        cards = parsed_sample_deck
 
         assert len(cards) == 2
 
@@ -222,6 +651,46 @@ Machine Learning
         assert cards[1]['question'] == 'What is ML?'
         assert cards[1]['answer'] == 'Machine Learning'
 
+    def test_load_deck_cards_matches_parse_markdown_cards(self, deck_file_factory):
+        """Test that reading a deck file matches parsing its text."""
+        markdown = "---\r\ncard_id: abc123\r\n---\r\nWhat is Python?\r\nA language?\r\n---\r\nYes\r\n"
+        deck_file = deck_file_factory("deck-test-Abc12345.md", markdown.encode('utf-8'))
+
+        cards = main.load_deck_cards(deck_file)
+
+        assert cards == main.parse_markdown_cards(markdown.replace('\r\n', '\n'))
+        assert cards[0]['question'] == 'What is Python?\nA language?'
+
+    def test_load_deck_cards_empty_file(self, deck_file_factory):
+        """Test that an empty deck file yields no cards."""
+        assert main.load_deck_cards(deck_file_factory("deck-empty-abc123.md", b"")) == []
+
+    def test_write_deck_file_round_trips(self, tmp_path):
+        """Test that a written deck file parses back to the same cards."""
+        cards = [
+            {'card_id': 'abc123', 'question': 'Q1', 'answer': 'A1', 'tags': ['t'], 'archived': False},
+            {'card_id': None, 'question': 'Q2', 'answer': 'A2', 'tags': [], 'archived': True},
+        ]
+        deck_file = tmp_path / "deck-test-Abc12345.md"
+
+        main.write_deck_file(deck_file, cards)
+
+        parsed = main.load_deck_cards(deck_file)
+        assert [(c['card_id'], c['question'], c['answer']) for c in parsed] == [
+            ('abc123', 'Q1', 'A1'), (None, 'Q2', 'A2')
+        ]
+        assert parsed[0]['tags'] == ['t']
+        assert parsed[1]['archived'] is True
+
+    def test_lookup_cached_grade(self):
+        """Test that cached grades are found by card content and misses return None."""
+        card = {'question': 'What is Python?', 'answer': 'A programming language'}
+        prompt = main.QUALITY_GRADING_PROMPT_TEMPLATE.format(question=card['question'], answer=card['answer'])
+        cache = {main.grading_cache_key(card['question'], card['answer'], prompt): [9, 'Clear']}
+
+        assert main.lookup_cached_grade(card, cache) == (9, 'Clear')
+        assert main.lookup_cached_grade({'question': 'Other', 'answer': 'Card'}, cache) is None
+
     def test_format_card_to_markdown(self):
         """Test formatting card dict to markdown."""
         card = {
@@ -232,13 +701,15 @@ Machine Learning
             'archived': False
         }
 
-        markdown = main.format_card_to_markdown(card)
+        lines = set(main.format_card_to_markdown(card).splitlines())
 
-        assert 'card_id: abc123' in markdown
-        assert 'tags: ["python", "basics"]' in markdown
-        assert 'What is Python?' in markdown
-        assert 'A programming language' in markdown
-        assert 'archived' not in markdown  # Should not include if False
+        assert {
+            'card_id: abc123',
+            'tags: ["python", "basics"]',
+            'What is Python?',
+            'A programming language',
+        } <= lines
+        assert not any(line.startswith('archived') for line in lines)  # Should not include if False
 
     def test_format_card_to_markdown_archived(self):
         """Test formatting archived card."""
@@ -250,236 +721,70 @@ Machine Learning
             'archived': True
         }
 
-        markdown = main.format_card_to_markdown(card)
+        lines = set(main.format_card_to_markdown(card).splitlines())
 
-        assert 'card_id: xyz789' in markdown
-        assert 'archived: true' in markdown
-        assert 'Old question' in markdown
+        assert {'card_id: xyz789', 'archived: true', 'Old question'} <= lines
 
 
 class TestValidation:
     """Test deck file validation."""
 
-    def test_validate_deck_file_valid(self, tmp_path):
-        """Test validating a valid deck file."""
-        deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
-tags: ["python"]
----
-What is Python?
----
-A programming language
----
-card_id: null
----
-What is ML?
----
-Machine Learning
-""")
+    @pytest.mark.parametrize("filename,content,questions,expected_deck_id", VALID_DECK_FILES)
+    def test_validate_deck_file_valid(self, deck_file_factory, filename, content, questions, expected_deck_id):
+        """Test validating valid deck files (existing and new decks)."""
+        deck_file = deck_file_factory(filename, content)
 
         cards, deck_id = main.validate_deck_file(deck_file)
-        assert len(cards) == 2
-        assert cards[0]['question'] == 'What is Python?'
-        assert cards[1]['question'] == 'What is ML?'
-        assert deck_id == 'Abc12345'
-
-    def test_validate_deck_file_not_found(self, tmp_path):
-        """Test validation fails for non-existent file."""
-        deck_file = tmp_path / "deck-nonexistent-abc123.md"
-
-        with pytest.raises(FileNotFoundError) as exc_info:
-            main.validate_deck_file(deck_file)
-        assert "not found" in str(exc_info.value)
-
-    def test_validate_deck_file_empty(self, tmp_path):
-        """Test validation fails for empty file."""
-        deck_file = tmp_path / "deck-empty-abc123.md"
-        deck_file.write_text("")
-
-        with pytest.raises(ValueError) as exc_info:
-            main.validate_deck_file(deck_file)
-        assert "empty" in str(exc_info.value).lower()
-
-    def test_validate_deck_file_invalid_filename(self, tmp_path):
-        """Test validation fails for invalid filename format."""
-        deck_file = tmp_path / "invalid.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Question?
----
-Answer
-""")
-
-        with pytest.raises(ValueError) as exc_info:
-            main.validate_deck_file(deck_file)
-        assert "filename format" in str(exc_info.value).lower()
-
-    def test_validate_deck_file_no_cards(self, tmp_path):
-        """Test validation fails when no cards found."""
-        deck_file = tmp_path / "deck-nocards-abc123.md"
-        deck_file.write_text("# Just a header\n\nSome text but no cards")
-
-        with pytest.raises(ValueError) as exc_info:
-            main.validate_deck_file(deck_file)
-        assert "no cards" in str(exc_info.value).lower()
-
-    def test_validate_deck_file_empty_question(self, tmp_path):
-        """Test validation fails for card with empty question."""
-        deck_file = tmp_path / "deck-badcard-abc123.md"
-        deck_file.write_text("""---
-card_id: card1
----
-
----
-This has an answer but no question
-""")
-
-        # Parsing may fail to create cards with empty question, resulting in "no cards"
-        with pytest.raises(ValueError) as exc_info:
-            main.validate_deck_file(deck_file)
-        # Accept either "no cards" or "empty question" error
-        error_msg = str(exc_info.value).lower()
-        assert "no cards" in error_msg or "empty question" in error_msg
-
-    def test_validate_deck_file_empty_answer(self, tmp_path):
-        """Test validation fails for card with empty answer."""
-        deck_file = tmp_path / "deck-badcard-abc123.md"
-        deck_file.write_text("""---
-card_id: card1
----
-This has a question
----
-
-""")
-
-        # Parsing may fail to create cards with empty answer, resulting in "no cards"
-        with pytest.raises(ValueError) as exc_info:
+        assert [card['question'] for card in cards] == questions
+        assert all(card['answer'] for card in cards)
+        assert deck_id == expected_deck_id
+
+    @pytest.mark.parametrize("filename,content,exc_type,messages", VALIDATION_ERRORS)
+    def test_validate_deck_file_errors(self, deck_file_factory, tmp_path_factory,
+                                       filename, content, exc_type, messages):
+        """Test validation fails with a descriptive error for invalid deck files."""
+        if content is None:
+            deck_file = tmp_path_factory.mktemp("missing") / filename
+        else:
+            deck_file = deck_file_factory(filename, content)
+
+        with pytest.raises(exc_type) as exc_info:
             main.validate_deck_file(deck_file)
-        # Accept either "no cards" or "empty answer" error
         error_msg = str(exc_info.value).lower()
-        assert "no cards" in error_msg or "empty answer" in error_msg
-
-    def test_validate_deck_file_whitespace_only(self, tmp_path):
-        """Test validation fails for whitespace-only content."""
-        deck_file = tmp_path / "deck-whitespace-abc123.md"
-        deck_file.write_text("   \n\n  \n  ")
-
-        with pytest.raises(ValueError) as exc_info:
-            main.validate_deck_file(deck_file)
-        assert "empty" in str(exc_info.value).lower()
-
-    def test_validate_deck_file_multiple_cards(self, tmp_path):
-        """Test validation succeeds with multiple valid cards."""
-        deck_file = tmp_path / "deck-multi-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
-tags: ["tag1", "tag2"]
-archived: false
----
-Question 1?
----
-Answer 1
----
-card_id: card2
-tags: []
----
-Question 2?
----
-Answer 2
----
-card_id: null
----
-Question 3?
----
-Answer 3
-""")
+        assert any(message in error_msg for message in messages)
 
-        cards, deck_id = main.validate_deck_file(deck_file)
-        assert len(cards) == 3
-        assert all('question' in card for card in cards)
-        assert all('answer' in card for card in cards)
-        assert deck_id == 'Abc12345'
-
-    def test_validate_deck_file_new_deck(self, tmp_path):
-        """Test validating a new deck file (without deck ID)."""
-        deck_file = tmp_path / "deck-mynewdeck.md"
-        deck_file.write_text("""---
-card_id: null
-tags: ["python"]
----
-What is Python?
----
-A programming language
----
-card_id: null
----
-What is ML?
----
-Machine Learning
-""")
 
-        cards, deck_id = main.validate_deck_file(deck_file)
-        assert len(cards) == 2
-        assert cards[0]['question'] == 'What is Python?'
-        assert cards[1]['question'] == 'What is ML?'
-        assert deck_id is None  # New deck has no ID yet
+# Deck filenames: (filename, expected deck ID, None for a new deck, or ValueError)
+EXTRACT_DECK_ID_CASES = [
+    pytest.param("deck-mytest-Abc12345.md", 'Abc12345', id="valid"),
+    pytest.param("deck-mynewdeck.md", None, id="new-deck"),
+    pytest.param("deck-my-cool-deck-Xyz78901.md", 'Xyz78901', id="hyphenated-name"),
+    pytest.param("mytest-abc123.md", ValueError, id="no-prefix"),
+    pytest.param("deck-.md", ValueError, id="just-deck"),
+    # Multi-hyphen names and 8-letter lowercase words are not deck IDs
+    pytest.param("deck-aiml-fundamentals.md", None, id="multi-hyphen-new-deck"),
+    pytest.param("deck-aiml-networks.md", None, id="lowercase-word-new-deck"),
+]
 
 
 class TestExtractDeckId:
     """Test deck ID extraction from filenames."""
 
-    def test_extract_deck_id_valid(self, tmp_path):
-        """Test extracting deck ID from valid filename."""
-        deck_file = tmp_path / "deck-mytest-Abc12345.md"
-        deck_file.touch()
-        deck_id = main.extract_deck_id_from_filename(deck_file)
-        assert deck_id == 'Abc12345'
-
-    def test_extract_deck_id_new_deck(self, tmp_path):
-        """Test extracting deck ID from new deck filename (no ID)."""
-        deck_file = tmp_path / "deck-mynewdeck.md"
-        deck_file.touch()
-        deck_id = main.extract_deck_id_from_filename(deck_file)
-        assert deck_id is None
-
-    def test_extract_deck_id_hyphenated_name(self, tmp_path):
-        """Test extracting deck ID from filename with hyphens in name."""
-        deck_file = tmp_path / "deck-my-cool-deck-Xyz78901.md"
-        deck_file.touch()
-        deck_id = main.extract_deck_id_from_filename(deck_file)
-        assert deck_id == 'Xyz78901'
-
-    def test_extract_deck_id_invalid_no_prefix(self, tmp_path):
-        """Test error for filename without deck- prefix."""
-        deck_file = tmp_path / "mytest-abc123.md"
-        deck_file.touch()
-        with pytest.raises(ValueError) as exc_info:
-            main.extract_deck_id_from_filename(deck_file)
-        assert "Expected: deck-" in str(exc_info.value)
-
-    def test_extract_deck_id_invalid_just_deck(self, tmp_path):
-        """Test error for filename that is just 'deck-.md'."""
-        deck_file = tmp_path / "deck-.md"
-        deck_file.touch()
-        with pytest.raises(ValueError) as exc_info:
-            main.extract_deck_id_from_filename(deck_file)
-        assert "Expected: deck-" in str(exc_info.value)
-
-    def test_extract_deck_id_multi_hyphen_new_deck(self, tmp_path):
-        """Test multi-hyphenated name without valid deck ID is treated as new deck."""
-        deck_file = tmp_path / "deck-aiml-fundamentals.md"
-        deck_file.touch()
-        deck_id = main.extract_deck_id_from_filename(deck_file)
-        assert deck_id is None
-
-    def test_extract_deck_id_lowercase_word_new_deck(self, tmp_path):
-        """Test 8-letter lowercase word is treated as new deck (not a valid deck ID)."""
-        deck_file = tmp_path / "deck-aiml-networks.md"
-        deck_file.touch()
-        deck_id = main.extract_deck_id_from_filename(deck_file)
-        assert deck_id is None
+    @pytest.mark.parametrize("filename,expected", EXTRACT_DECK_ID_CASES)
+    def test_extract_deck_id(self, filename, expected):
+        """Test extracting the deck ID (or None for new decks) and rejecting bad filenames."""
+        deck_file = PurePath(filename)
+        if expected is ValueError:
+            with pytest.raises(ValueError, match="Expected: deck-"):
+                main.extract_deck_id_from_filename(deck_file)
+        else:
+            assert main.extract_deck_id_from_filename(deck_file) == expected
+
+
+def _mktouch(dirpath, names):
+    """Create empty files in dirpath (one open/close each, no Path.touch stat/utime)."""
+    for name in names:
+        os.close(os.open(os.path.join(dirpath, name), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
 
 
 class TestFindDeckFiles:
@@ -487,12 +792,8 @@ class TestFindDeckFiles:
 
     def test_find_deck_files_multiple(self, tmp_path):
         """Test finding multiple deck files."""
-        # Create test deck files
-        (tmp_path / "deck-python-abc123Xy.md").touch()
-        (tmp_path / "deck-javascript-def456Zw.md").touch()
-        (tmp_path / "deck-ruby.md").touch()  # New deck without ID
-        # Create non-deck file
-        (tmp_path / "README.md").touch()
+        # Deck files (deck-ruby.md is a new deck without ID) plus a non-deck file
+        _mktouch(tmp_path, ("deck-python-abc123Xy.md", "deck-javascript-def456Zw.md", "deck-ruby.md", "README.md"))
 
         deck_files = main.find_deck_files(str(tmp_path))
 
@@ -510,8 +811,7 @@ class TestFindDeckFiles:
 
     def test_find_deck_files_no_deck_files(self, tmp_path):
         """Test finding deck files when only non-deck files exist."""
-        (tmp_path / "README.md").touch()
-        (tmp_path / "notes.txt").touch()
+        _mktouch(tmp_path, ("README.md", "notes.txt"))
 
         deck_files = main.find_deck_files(str(tmp_path))
         assert len(deck_files) == 0
@@ -519,9 +819,7 @@ class TestFindDeckFiles:
     def test_find_deck_files_sorted(self, tmp_path):
         """Test that deck files are returned sorted."""
         # Create files in non-alphabetical order
-        (tmp_path / "deck-z-file.md").touch()
-        (tmp_path / "deck-a-file.md").touch()
-        (tmp_path / "deck-m-file.md").touch()
+        _mktouch(tmp_path, ("deck-z-file.md", "deck-a-file.md", "deck-m-file.md"))
 
         deck_files = main.find_deck_files(str(tmp_path))
 
@@ -531,78 +829,73 @@ class TestFindDeckFiles:
         assert deck_files[2].name == "deck-z-file.md"
 
 
+@pytest.fixture
+def sync_stubs(monkeypatch):
+    """Stub the Mochi API calls and confirmation prompt used by sync/push.
+
+    Tests set remote_cards, created_card and answer; update/delete calls are
+    recorded in updated and deleted. Creates (by content) and updates (by card
+    ID) listed in failing raise requests.HTTPError.
+    """
+    stubs = SimpleNamespace(remote_cards=[], created_card=None, answer='n', updated=[], deleted=[],
+                            failing=set())
+
+    def fail_if_listed(key):
+        if key in stubs.failing:
+            raise requests.HTTPError(f"500 Server Error: {key}")
+
+    def create_card(deck_id, content, **kwargs):
+        fail_if_listed(content)
+        return stubs.created_card
+
+    def update_card(card_id, **kwargs):
+        fail_if_listed(card_id)
+        stubs.updated.append((card_id, kwargs))
+
+    monkeypatch.setattr(main, 'get_cards', lambda deck_id, limit=100: stubs.remote_cards)
+    monkeypatch.setattr(main, 'create_card', create_card)
+    monkeypatch.setattr(main, 'update_card', update_card)
+    monkeypatch.setattr(main, 'delete_card', stubs.deleted.append)
+    monkeypatch.setattr('builtins.input', lambda prompt='': stubs.answer)
+    return stubs
+
+
 class TestSyncCommand:
     """Test sync command functionality."""
 
-    def test_sync_detects_remotely_deleted_cards(self, tmp_path, monkeypatch):
+    @pytest.fixture(autouse=True)
+    def _api_key(self, monkeypatch):
+        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+
+    def test_sync_detects_remotely_deleted_cards(self, tmp_path, sync_stubs):
         """Test that sync detects and handles cards deleted remotely."""
         # Create a deck file with cards
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Question 1
----
-Answer 1
----
-card_id: card2
----
-Question 2
----
-Answer 2
----
-card_id: card3
----
-Question 3
----
-Answer 3
-""")
+        deck_file.write_bytes(THREE_CARD_DECK_MD)
 
-        # Mock API_KEY
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
-
-        # Mock get_cards to return only card1 and card3 (card2 deleted remotely)
-        mock_remote_cards = [
+        # Remote only has card1 and card3 (card2 deleted remotely)
+        sync_stubs.remote_cards = [
             {'id': 'card1', 'content': 'Question 1\n---\nAnswer 1', 'tags': [], 'archived': False},
             {'id': 'card3', 'content': 'Question 3\n---\nAnswer 3', 'tags': [], 'archived': False}
         ]
 
-        # Mock user input to proceed with sync
-        with patch('main.get_cards', return_value=mock_remote_cards), \
-             patch('builtins.input', return_value='y'):
-
-            main.sync(str(deck_file))
-
-        # Read the updated file
-        updated_content = deck_file.read_text()
+        # User confirms the sync
+        sync_stubs.answer = 'y'
+        main.sync(str(deck_file))
 
-        # Verify card2 was removed locally
-        assert 'card1' in updated_content
-        assert 'card2' not in updated_content
-        assert 'card3' in updated_content
-        assert 'Question 2' not in updated_content
+        # Verify card2 was removed locally and the other cards are untouched
+        assert main.load_deck_cards(deck_file) == [EXPECTED_THREE_CARDS[0], EXPECTED_THREE_CARDS[2]]
 
-    def test_sync_creates_new_cards_remotely(self, tmp_path, monkeypatch):
+    def test_sync_creates_new_cards_remotely(self, tmp_path, sync_stubs):
         """Test that sync creates new cards without IDs remotely."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: null
----
-New Question
----
-New Answer
-""")
-
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+        deck_file.write_bytes(NEW_CARD_DECK_MD)
 
-        mock_remote_cards = []
-        mock_created_card = {'id': 'new_card_id', 'content': 'New Question\n---\nNew Answer'}
+        sync_stubs.remote_cards = []
+        sync_stubs.created_card = {'id': 'new_card_id', 'content': 'New Question\n---\nNew Answer'}
+        sync_stubs.answer = 'y'
 
-        with patch('main.get_cards', return_value=mock_remote_cards), \
-             patch('main.create_card', return_value=mock_created_card), \
-             patch('builtins.input', return_value='y'):
-
-            main.sync(str(deck_file))
+        main.sync(str(deck_file))
 
         # Read updated file
         updated_content = deck_file.read_text()
@@ -610,196 +903,168 @@ New Answer
         # Verify card was assigned an ID
         assert 'card_id: new_card_id' in updated_content
 
-    def test_sync_updates_existing_cards(self, tmp_path, monkeypatch):
+    def test_sync_updates_existing_cards(self, tmp_path, sync_stubs):
         """Test that sync updates cards with changed content."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Updated Question
----
-Updated Answer
-""")
+        deck_file.write_bytes(UPDATED_CARD_DECK_MD)
 
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
-
-        mock_remote_cards = [
+        sync_stubs.remote_cards = [
             {'id': 'card1', 'content': 'Old Question\n---\nOld Answer', 'tags': [], 'archived': False}
         ]
+        sync_stubs.answer = 'y'
 
-        updated = False
-
-        def mock_update_card(card_id, **kwargs):
-            nonlocal updated
-            updated = True
-            assert card_id == 'card1'
-            assert 'Updated Question' in kwargs['content']
-            assert 'Updated Answer' in kwargs['content']
-
-        with patch('main.get_cards', return_value=mock_remote_cards), \
-             patch('main.update_card', side_effect=mock_update_card), \
-             patch('builtins.input', return_value='y'):
-
-            main.sync(str(deck_file))
+        main.sync(str(deck_file))
 
-        assert updated, "update_card should have been called"
+        assert len(sync_stubs.updated) == 1
+        card_id, kwargs = sync_stubs.updated[0]
+        assert card_id == 'card1'
+        assert 'Updated Question' in kwargs['content']
+        assert 'Updated Answer' in kwargs['content']
 
-    def test_sync_deletes_remote_cards_not_in_local(self, tmp_path, monkeypatch):
+    def test_sync_deletes_remote_cards_not_in_local(self, tmp_path, sync_stubs):
         """Test that sync deletes remote cards that were removed locally."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Question 1
----
-Answer 1
-""")
-
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+        deck_file.write_bytes(ONE_CARD_DECK_MD)
 
         # Remote has card1 and card2, but local only has card1
-        mock_remote_cards = [
+        sync_stubs.remote_cards = [
             {'id': 'card1', 'content': 'Question 1\n---\nAnswer 1', 'tags': [], 'archived': False},
             {'id': 'card2', 'content': 'Question 2\n---\nAnswer 2', 'tags': [], 'archived': False}
         ]
+        sync_stubs.answer = 'y'
 
-        deleted = False
-
-        def mock_delete_card(card_id):
-            nonlocal deleted
-            deleted = True
-            assert card_id == 'card2'
-
-        with patch('main.get_cards', return_value=mock_remote_cards), \
-             patch('main.delete_card', side_effect=mock_delete_card), \
-             patch('builtins.input', return_value='y'):
-
-            main.sync(str(deck_file))
+        main.sync(str(deck_file))
 
-        assert deleted, "delete_card should have been called for card2"
+        assert sync_stubs.deleted == ['card2']
 
-    def test_sync_aborts_without_confirmation(self, tmp_path, monkeypatch, capsys):
+    def test_sync_aborts_without_confirmation(self, tmp_path, capsys, sync_stubs):
         """Test that sync aborts when user doesn't confirm."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Question 1
----
-Answer 1
-""")
-
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+        deck_file.write_bytes(ONE_CARD_DECK_MD)
 
-        mock_remote_cards = []
+        sync_stubs.remote_cards = []
+        sync_stubs.answer = 'n'
 
-        with patch('main.get_cards', return_value=mock_remote_cards), \
-             patch('builtins.input', return_value='n'):
-
-            main.sync(str(deck_file))
+        main.sync(str(deck_file))
 
         captured = capsys.readouterr()
         assert 'Aborted' in captured.out
 
-    def test_sync_fails_for_new_deck_without_id(self, tmp_path, monkeypatch, capsys):
+    def test_sync_fails_for_new_deck_without_id(self, tmp_path, capsys):
         """Test that sync fails for new deck files without deck ID."""
         deck_file = tmp_path / "deck-newdeck.md"
-        deck_file.write_text("""---
-card_id: null
----
-Question
----
-Answer
-""")
-
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+        deck_file.write_bytes(NEW_DECK_MD)
 
         main.sync(str(deck_file))
 
         captured = capsys.readouterr()
-        assert 'Cannot sync new deck file' in captured.out
-        assert 'Use \'push\' command' in captured.out
+        assert NEW_DECK_SYNC_ERROR.search(captured.out)
 
-    def test_sync_everything_in_sync(self, tmp_path, monkeypatch, capsys):
+    def test_sync_everything_in_sync(self, tmp_path, capsys, sync_stubs):
         """Test sync when everything is already in sync."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Question 1
----
-Answer 1
-""")
+        deck_file.write_bytes(ONE_CARD_DECK_MD)
 
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
-
-        mock_remote_cards = [
+        sync_stubs.remote_cards = [
             {'id': 'card1', 'content': 'Question 1\n---\nAnswer 1', 'tags': [], 'archived': False}
         ]
 
-        with patch('main.get_cards', return_value=mock_remote_cards):
-            main.sync(str(deck_file))
+        main.sync(str(deck_file))
 
         captured = capsys.readouterr()
         assert 'Everything in sync' in captured.out
 
+    def test_sync_keeps_successful_changes_when_an_update_fails(self, tmp_path, capsys, sync_stubs):
+        """Test that a failed update is reported and re-raised after new card IDs are saved."""
+        deck_file = tmp_path / "deck-test-Abc12345.md"
+        deck_file.write_bytes(b"".join((
+            card_md("card1", "Updated Question 1", "Answer 1"),
+            card_md("card2", "Updated Question 2", "Answer 2"),
+            NEW_CARD_DECK_MD,
+        )))
+
+        sync_stubs.remote_cards = [
+            {'id': 'card1', 'content': 'Question 1\n---\nAnswer 1', 'tags': [], 'archived': False},
+            {'id': 'card2', 'content': 'Question 2\n---\nAnswer 2', 'tags': [], 'archived': False}
+        ]
+        sync_stubs.created_card = {'id': 'new_card_id'}
+        sync_stubs.failing = {'card2'}
+        sync_stubs.answer = 'y'
+
+        with pytest.raises(requests.HTTPError, match="card2"):
+            main.sync(str(deck_file))
+
+        assert [card['card_id'] for card in main.load_deck_cards(deck_file)] == ['card1', 'card2', 'new_card_id']
+        assert [card_id for card_id, _ in sync_stubs.updated] == ['card1']
+        assert '✗ update card2' in capsys.readouterr().out
+
 
 class TestPushWithMissingRemoteCards:
     """Test push command behavior when cards are missing remotely."""
 
-    def test_push_raises_assertion_for_missing_remote_cards(self, tmp_path, monkeypatch):
+    @pytest.fixture(autouse=True)
+    def _api_key(self, monkeypatch):
+        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+
+    def test_push_raises_assertion_for_missing_remote_cards(self, tmp_path, sync_stubs):
         """Test that push raises AssertionError when cards exist locally but not remotely."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: card1
----
-Question 1
----
-Answer 1
----
-card_id: card2
----
-Question 2
----
-Answer 2
-""")
-
-        monkeypatch.setattr(main, 'API_KEY', 'test_key')
+        deck_file.write_bytes(TWO_CARD_DECK_MD)
 
         # Remote only has card1 (card2 is missing)
-        mock_remote_cards = [
+        sync_stubs.remote_cards = [
             {'id': 'card1', 'content': 'Question 1\n---\nAnswer 1', 'tags': [], 'archived': False}
         ]
 
-        with patch('main.get_cards', return_value=mock_remote_cards):
-            with pytest.raises(AssertionError) as exc_info:
-                main.push(str(deck_file))
+        with pytest.raises(AssertionError) as exc_info:
+            main.push(str(deck_file))
 
-            assert 'local cards not found remotely' in str(exc_info.value)
+        assert 'local cards not found remotely' in str(exc_info.value)
 
-    def test_push_error_message_suggests_sync(self, tmp_path, monkeypatch, capsys):
+    def test_push_error_message_suggests_sync(self, tmp_path, capsys, sync_stubs):
         """Test that push error message suggests using sync command."""
         deck_file = tmp_path / "deck-test-Abc12345.md"
-        deck_file.write_text("""---
-card_id: missing_card
----
-Question
----
-Answer
-""")
+        deck_file.write_bytes(MISSING_CARD_DECK_MD)
+
+        sync_stubs.remote_cards = []
+
+        with pytest.raises(AssertionError):
+            main.push(str(deck_file))
+
+        captured = capsys.readouterr()
+        assert PUSH_INCONSISTENCY_ERROR.search(captured.out)
+
 
+class TestPushWithFailedRequests:
+    """Test push command behavior when some remote requests fail."""
+
+    @pytest.fixture(autouse=True)
+    def _api_key(self, monkeypatch):
         monkeypatch.setattr(main, 'API_KEY', 'test_key')
 
-        mock_remote_cards = []
+    def test_push_saves_created_ids_when_a_create_fails(self, tmp_path, capsys, sync_stubs):
+        """Test that cards created before a failure keep their IDs and the error is re-raised."""
+        broken = card_md(None, "Broken Question", "Broken Answer")
+        deck_file = tmp_path / "deck-test-Abc12345.md"
+        deck_file.write_bytes(b"".join((CARD1_MD, NEW_CARD_DECK_MD, broken)))
+
+        sync_stubs.remote_cards = [
+            {'id': 'card1', 'content': 'Question 1\n---\nAnswer 1', 'tags': [], 'archived': False}
+        ]
+        sync_stubs.created_card = {'id': 'new_card_id'}
+        sync_stubs.failing = {'Broken Question\n---\nBroken Answer'}
+        sync_stubs.answer = 'y'
 
-        with patch('main.get_cards', return_value=mock_remote_cards):
-            with pytest.raises(AssertionError):
-                main.push(str(deck_file))
+        with pytest.raises(requests.HTTPError, match="Broken Question"):
+            main.push(str(deck_file))
 
-        captured = capsys.readouterr()
-        assert 'Data inconsistency detected' in captured.out
-        assert 'use \'sync\' command' in captured.out
+        assert [card['card_id'] for card in main.load_deck_cards(deck_file)] == ['card1', 'new_card_id', None]
+        assert "✗ create 'Broken Question'" in capsys.readouterr().out
 
 
 if __name__ == '__main__':
-    pytest.main([__file__, '-v'])
+    # Standalone runs skip .pytest_cache I/O; set PYTEST_NO_COV=1 to also skip pytest-cov
+    args = [__file__, '-v', '-p', 'no:cacheprovider']
+    if os.getenv('PYTEST_NO_COV') == '1':
+        args += ['-p', 'no:cov']
+    pytest.main(args)